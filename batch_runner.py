@@ -0,0 +1,240 @@
+import fitz  # PyMuPDF
+import argparse
+import collections
+import glob
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+import time
+import profiling
+from ocr_cache import OCRCache, DEFAULT_CACHE_DIR
+from ocr_pdf_to_text import ocr_page
+from detect_and_crop_illustrations import detect_page, write_crops
+from extract_images_from_pdf import first_occurrences, extract_page_images, assemble_pages, finish_extraction
+
+# Long-running runner for many books: page-level OCR, image extraction and
+# illustration cropping tasks from every book share one process pool, taken
+# round-robin so all books progress together. Page status and results live
+# in a SQLite job store, so an interrupted run picks up where it stopped,
+# and each book's outputs are assembled exactly as the single-book CLIs write them.
+
+TOOLS = ("ocr", "images", "illustrations")
+OUTPUT_SUFFIXES = {"ocr": "_ocr.txt", "images": "_images", "illustrations": "_cropped_images"}
+DEFAULT_DB = "batch_jobs.sqlite"
+OPEN_DOCS = 4 # Documents each worker keeps open; tasks from the same book tend to arrive together
+
+_worker = {}
+
+def output_path(pdf_path, tool, output_dir=None):
+    """Where the single-book CLI would write `tool`'s output (under output_dir if given)."""
+    base = os.path.splitext(pdf_path)[0]
+    if output_dir: base = os.path.join(output_dir, os.path.basename(base))
+    return base + OUTPUT_SUFFIXES[tool]
+
+def find_pdfs(inputs):
+    """PDF paths from files, directories (their *.pdf) and manifests (.txt: one path per line, .json: a list)."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item): paths.extend(sorted(glob.glob(os.path.join(item, "*.pdf"))))
+        elif item.lower().endswith(".json"):
+            with open(item, "r", encoding="utf-8") as f: paths.extend(json.load(f))
+        elif item.lower().endswith(".txt"):
+            with open(item, "r", encoding="utf-8") as f:
+                paths.extend(line.strip() for line in f if line.strip() and not line.lstrip().startswith("#"))
+        else: paths.append(item)
+    unique = []
+    for path in (os.path.abspath(path) for path in paths):
+        if path not in unique: unique.append(path)
+    return unique
+
+class JobStore:
+    """SQLite record of books, their page tasks and finished outputs."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL"); self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS books (id INTEGER PRIMARY KEY, pdf TEXT UNIQUE, size INTEGER, mtime REAL, pages INTEGER);
+            CREATE TABLE IF NOT EXISTS tasks (book_id INTEGER, tool TEXT, page INTEGER, status TEXT, result TEXT, error TEXT,
+                                              PRIMARY KEY (book_id, tool, page));
+            CREATE TABLE IF NOT EXISTS outputs (book_id INTEGER, tool TEXT, path TEXT, finished REAL, PRIMARY KEY (book_id, tool));
+        """)
+
+    def add_book(self, pdf_path, page_count, outputs):
+        """Registers a book and its tasks; returns its id. `outputs` is {tool: output path}.
+
+        Work recorded for a different version of the file, or for another
+        output location, is dropped and redone.
+        """
+        stat = os.stat(pdf_path)
+        row = self.conn.execute("SELECT id, size, mtime, pages FROM books WHERE pdf = ?", (pdf_path,)).fetchone()
+        if row and tuple(row[1:]) != (stat.st_size, stat.st_mtime, page_count):
+            self.conn.execute("DELETE FROM tasks WHERE book_id = ?", (row[0],)); self.conn.execute("DELETE FROM outputs WHERE book_id = ?", (row[0],))
+            self.conn.execute("UPDATE books SET size = ?, mtime = ?, pages = ? WHERE id = ?", (stat.st_size, stat.st_mtime, page_count, row[0]))
+        if row is None:
+            book_id = self.conn.execute("INSERT INTO books (pdf, size, mtime, pages) VALUES (?, ?, ?, ?)",
+                                        (pdf_path, stat.st_size, stat.st_mtime, page_count)).lastrowid
+        else: book_id = row[0]
+        for tool, path in outputs.items():
+            recorded = self.conn.execute("SELECT path FROM outputs WHERE book_id = ? AND tool = ?", (book_id, tool)).fetchone()
+            if recorded and recorded[0] != path:
+                self.conn.execute("DELETE FROM tasks WHERE book_id = ? AND tool = ?", (book_id, tool))
+                self.conn.execute("DELETE FROM outputs WHERE book_id = ? AND tool = ?", (book_id, tool))
+            self.conn.execute("INSERT OR IGNORE INTO outputs (book_id, tool, path, finished) VALUES (?, ?, ?, NULL)", (book_id, tool, path))
+            self.conn.executemany("INSERT OR IGNORE INTO tasks (book_id, tool, page, status) VALUES (?, ?, ?, 'pending')",
+                                  ((book_id, tool, page) for page in range(page_count)))
+        self.conn.commit()
+        return book_id
+
+    def pending_pages(self, book_id, tool):
+        """Pages not done yet; failed pages are retried on every run."""
+        return [page for (page,) in self.conn.execute("SELECT page FROM tasks WHERE book_id = ? AND tool = ? AND status != 'done' ORDER BY page", (book_id, tool))]
+
+    def output_finished(self, book_id, tool):
+        row = self.conn.execute("SELECT path, finished FROM outputs WHERE book_id = ? AND tool = ?", (book_id, tool)).fetchone()
+        return bool(row and row[1] is not None and os.path.exists(row[0]))
+
+    def finish_task(self, book_id, tool, page, result):
+        self.conn.execute("UPDATE tasks SET status = 'done', result = ?, error = NULL WHERE book_id = ? AND tool = ? AND page = ?", (result, book_id, tool, page))
+        self.conn.commit()
+
+    def fail_task(self, book_id, tool, page, error):
+        self.conn.execute("UPDATE tasks SET status = 'failed', error = ? WHERE book_id = ? AND tool = ? AND page = ?", (error, book_id, tool, page))
+        self.conn.commit()
+
+    def results(self, book_id, tool):
+        return [result for (result,) in self.conn.execute("SELECT result FROM tasks WHERE book_id = ? AND tool = ? ORDER BY page", (book_id, tool))]
+
+    def mark_finished(self, book_id, tool):
+        self.conn.execute("UPDATE outputs SET finished = ? WHERE book_id = ? AND tool = ?", (time.time(), book_id, tool))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+def _init_worker(cache_dir, prepass_dpi, profile):
+    # Parallelism comes from the pool; keep each Tesseract process single-threaded.
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+    _worker.update(cache=OCRCache(cache_dir) if cache_dir else None, prepass_dpi=prepass_dpi, docs=collections.OrderedDict(), first={})
+    profiling.enable(profile)
+
+def _worker_doc(pdf_path):
+    docs = _worker["docs"]
+    if pdf_path in docs: docs.move_to_end(pdf_path); return docs[pdf_path]
+    if len(docs) >= OPEN_DOCS:
+        old_path, old_doc = docs.popitem(last=False); old_doc.close(); _worker["first"].pop(old_path, None)
+    docs[pdf_path] = doc = fitz.open(pdf_path)
+    return doc
+
+def run_page_task(pdf_path, tool, page_index, out_path):
+    """Does one page of one tool; returns the result string kept in the job store."""
+    doc = _worker_doc(pdf_path)
+    if tool == "ocr": return ocr_page(doc, page_index, _worker["cache"])
+    if tool == "images":
+        if pdf_path not in _worker["first"]: _worker["first"][pdf_path] = first_occurrences(doc)
+        return json.dumps(extract_page_images(doc, page_index, out_path, _worker["first"][pdf_path]))
+    _page_index, crops, _decision = detect_page(doc, page_index, _worker["prepass_dpi"])
+    return json.dumps([filename for filename, ok in write_crops(crops, page_index, out_path) if ok])
+
+def _run_task(task):
+    book_id, pdf_path, tool, page_index, out_path = task
+    try: result, error = run_page_task(pdf_path, tool, page_index, out_path), None
+    except Exception as e: result, error = None, f"{type(e).__name__}: {e}"
+    records = profiling.take()
+    for record in records: record["page"] = f"{os.path.basename(pdf_path)}:{record['page']}"
+    return task, result, error, records
+
+def round_robin(queues):
+    """Yields one task from each queue in turn, so every book keeps moving."""
+    queues = collections.deque(iter(queue) for queue in queues)
+    while queues:
+        queue = queues.popleft(); task = next(queue, None)
+        if task is not None: yield task; queues.append(queue)
+
+def finish_output(store, book_id, pdf_path, tool, path, page_count, duplicates):
+    """Assembles a book's output from its page results, the way the single-book CLI writes it."""
+    results = store.results(book_id, tool)
+    if tool == "ocr":
+        # ocr_pdf separates pages with a blank line; write to a temporary name so a crash never leaves half a file
+        with open(path + ".tmp", "wb") as f: f.write("\n\n".join(results).encode("utf-8"))
+        os.replace(path + ".tmp", path)
+        message = f"{page_count} pages of text"
+    elif tool == "images":
+        images, pages, repeats = assemble_pages([json.loads(result) for result in results])
+        finish_extraction(pdf_path, path, page_count, images, pages, repeats, duplicates)
+        message = f"{len(images)} unique images ({len(repeats)} repeats)"
+    else: message = f"{sum(len(json.loads(result)) for result in results)} cropped images"
+    store.mark_finished(book_id, tool)
+    print(f"Finished: {os.path.basename(pdf_path)} {tool} -> {path} ({message})")
+
+def run_batch(pdf_paths, tools=("ocr",), db_path=DEFAULT_DB, workers=None, output_dir=None,
+              cache_dir=DEFAULT_CACHE_DIR, prepass_dpi=50, duplicates="link"):
+    start_time = time.perf_counter()
+    store = JobStore(db_path)
+    books = {}; queues = []; remaining = {}
+    for pdf_path in pdf_paths:
+        try:
+            with fitz.open(pdf_path) as doc: page_count = len(doc)
+        except Exception as e: print(f"Skipped: {pdf_path} ({e})"); continue
+        outputs = {tool: output_path(pdf_path, tool, output_dir) for tool in tools}
+        book_id = store.add_book(pdf_path, page_count, outputs)
+        books[book_id] = (pdf_path, page_count, outputs)
+        book_tasks = []
+        for tool in tools:
+            if store.output_finished(book_id, tool): continue
+            if tool != "ocr": os.makedirs(outputs[tool], exist_ok=True)
+            pages = store.pending_pages(book_id, tool)
+            remaining[book_id, tool] = len(pages)
+            if not pages: finish_output(store, book_id, pdf_path, tool, outputs[tool], page_count, duplicates) # Finished before a crash
+            book_tasks.extend((page, tool) for page in pages)
+        # Within a book, page order; OCR, images and crops of a page go out together
+        queues.append([(book_id, pdf_path, tool, page, outputs[tool]) for page, tool in sorted(book_tasks, key=lambda item: (item[0], tools.index(item[1])))])
+
+    total = sum(len(queue) for queue in queues); done = 0; failed = collections.Counter()
+    print(f"Processing {total} page tasks from {len(books)} books with {workers or os.cpu_count()} workers...")
+    if total:
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(cache_dir, prepass_dpi, profiling.enabled())) as pool:
+            for (book_id, pdf_path, tool, page, path), result, error, records in pool.imap_unordered(_run_task, round_robin(queues)):
+                profiling.extend(records); done += 1
+                if error:
+                    store.fail_task(book_id, tool, page, error); failed[book_id, tool] += 1
+                    print(f"[{done}/{total}] FAILED {os.path.basename(pdf_path)} {tool} page {page+1}: {error}")
+                else:
+                    store.finish_task(book_id, tool, page, result)
+                    print(f"[{done}/{total}] {os.path.basename(pdf_path)} {tool} page {page+1}")
+                remaining[book_id, tool] -= 1
+                if remaining[book_id, tool] == 0 and not failed[book_id, tool]:
+                    finish_output(store, book_id, pdf_path, tool, path, books[book_id][1], duplicates)
+    store.close()
+    profiling.add("run_batch", time.perf_counter() - start_time, count=total)
+
+    for (book_id, tool), count in failed.items():
+        print(f"Incomplete: {books[book_id][0]} {tool} ({count} pages failed; rerun to retry them)")
+    print(f"✅ Done. {done - sum(failed.values())} of {total} page tasks succeeded; job store: {db_path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(usage="python batch_runner.py <books_dir | book.pdf | manifest.txt>... [--tools ocr images illustrations] [--workers N]")
+    parser.add_argument("inputs", nargs="+", help="PDF files, directories of PDFs, or manifests (.txt with one path per line, or a .json list)")
+    parser.add_argument("--tools", nargs="+", choices=TOOLS, default=["ocr"], help="what to produce for each book (default: ocr)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes shared by all books (default: all cores)")
+    parser.add_argument("--db", default=DEFAULT_DB, help=f"SQLite job store; rerunning with the same one resumes (default: {DEFAULT_DB})")
+    parser.add_argument("--output-dir", help="write outputs here instead of next to each PDF")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="OCR result cache directory")
+    parser.add_argument("--no-cache", action="store_true", help="always rerun Tesseract")
+    parser.add_argument("--prepass-dpi", type=int, default=50, help="illustrations: dpi of the quick check that skips pages without candidates (0: off)")
+    parser.add_argument("--duplicates", choices=["link", "copy", "manifest"], default="link", help="images: how to store an image repeated on later pages")
+    parser.add_argument("--profile", metavar="PATH", help="record per-page stage timings to PATH (.json, or .csv for the raw records)")
+    args = parser.parse_args()
+
+    pdf_paths = find_pdfs(args.inputs)
+    if not pdf_paths:
+        print("No PDF files found.")
+        sys.exit(1)
+    if args.output_dir: os.makedirs(args.output_dir, exist_ok=True)
+
+    profiling.enable(bool(args.profile))
+    tools = tuple(tool for tool in TOOLS if tool in args.tools)
+    run_batch(pdf_paths, tools, args.db, args.workers, args.output_dir, None if args.no_cache else args.cache_dir, args.prepass_dpi, args.duplicates)
+    if args.profile: profiling.report(args.profile)
@@ -0,0 +1,118 @@
+import cv2
+import argparse
+import fnmatch
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+import ocr_engine
+import profiling
+from ocr_cache import OCRCache, DEFAULT_CACHE_DIR, image_digest
+
+# Headless counterpart of tesseract_select_text_regions16.py: detects blocks,
+# OCRs the selected regions and writes the same <name>_combined_ocr.txt files
+# the GUI's "Edit Combined Text" mode saves, for whole directories of scans.
+
+_worker = {}
+
+def load_region_file(path):
+    """Loads a region selection file.
+
+    Keys are image file names (or glob patterns, with "*" as the fallback);
+    values look like {"blocks": [[block, par, line], ...],
+    "rects": [[x1, y1, x2, y2], ...]} or {"all_blocks": true}.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def selection_for_image(region_spec, image_path):
+    if region_spec is None: return {"all_blocks": True}
+    name = os.path.basename(image_path)
+    for key in (image_path, name):
+        if key in region_spec: return region_spec[key]
+    for pattern, selection in region_spec.items():
+        if pattern != "*" and fnmatch.fnmatch(name, pattern): return selection
+    return region_spec.get("*")
+
+def _init_worker(corrections_map, output_dir, cache_dir, conf_threshold, pad, profile=False):
+    # Parallelism comes from the pool; keep each Tesseract process single-threaded.
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+    profiling.enable(profile)
+    _worker.update(corrections=ocr_engine.CorrectionsMatcher(corrections_map), output_dir=output_dir, conf_threshold=conf_threshold, pad=pad,
+                   cache=OCRCache(cache_dir) if cache_dir else None)
+
+def process_image(image_path, selection):
+    """Returns (image_path, output_path or None, message)."""
+    image = cv2.imread(image_path)
+    if image is None: return image_path, None, "could not read image"
+    image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) # Same conversion as the GUI, so crops match pixel for pixel
+    cache = _worker["cache"]; digest = image_digest(image) if cache else None
+    # Default bands, as in the GUI's page pass: block ids in region files and cached results carry over
+    block_coords, word_table = ocr_engine.detect_text_blocks(image, _worker["conf_threshold"], cache, digest)
+    if selection.get("all_blocks"): block_ids = list(block_coords)
+    else: block_ids = [tuple(block_id) for block_id in selection.get("blocks", [])]
+    regions, source_ids, _ = ocr_engine.collect_regions(block_ids, block_coords, selection.get("rects", []))
+    if not regions: return image_path, None, "no regions selected"
+    full_text = ocr_engine.combine_regions(image, regions, source_ids, _worker["corrections"], _worker["pad"], cache, digest,
+                                           word_table.texts_for(block_ids)) # Selected blocks reuse the page pass
+    output_path = ocr_engine.combined_output_path(_worker["output_dir"], image_path)
+    with open(output_path, "w", encoding="utf-8") as f: f.write(full_text.strip()) # As the GUI editor saves it
+    return image_path, output_path, f"{len(regions)} regions"
+
+def _process_image_task(task):
+    image_path, selection = task
+    try: result = process_image(image_path, selection)
+    except Exception as e: result = image_path, None, f"ERROR: {e}"
+    # ocr_engine's stages do not know the image; attribute them to it on the way back
+    records = profiling.take()
+    for record in records:
+        if record["page"] is None: record["page"] = os.path.basename(image_path)
+    return result, records
+
+def batch_process(image_paths, region_spec=None, output_dir=ocr_engine.DEFAULTS["output_dir"],
+                  corrections_file="corrections.txt", workers=None, cache_dir=DEFAULT_CACHE_DIR,
+                  conf_threshold=ocr_engine.DEFAULTS["ocr_confidence_threshold"], pad=ocr_engine.DEFAULTS["block_padding"]):
+    start_time = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    corrections_map = ocr_engine.read_corrections_file(corrections_file)
+    tasks = []
+    for image_path in image_paths:
+        selection = selection_for_image(region_spec, image_path)
+        if selection is None: print(f"Skipped (no regions in region file): {image_path}"); continue
+        tasks.append((image_path, selection))
+    print(f"Processing {len(tasks)} images with {workers or os.cpu_count()} workers...")
+    written = 0
+    with multiprocessing.Pool(workers, initializer=_init_worker,
+                              initargs=(corrections_map, output_dir, cache_dir, conf_threshold, pad, profiling.enabled())) as pool:
+        for (image_path, output_path, message), records in pool.imap_unordered(_process_image_task, tasks):
+            profiling.extend(records)
+            if output_path: written += 1; print(f"Saved: {output_path} ({message})")
+            else: print(f"Skipped: {image_path} ({message})")
+    profiling.add("batch_process", time.perf_counter() - start_time, count=len(tasks))
+    print(f"✅ Done. {written} combined OCR files saved to {output_dir}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(usage='python batch_select_regions.py "<images glob>" [--regions regions.json | --all-blocks] [--workers N] [--profile timings.json]')
+    parser.add_argument("images", nargs="+", help="image files or glob patterns")
+    selection_group = parser.add_mutually_exclusive_group()
+    selection_group.add_argument("--regions", help="JSON region selection file")
+    selection_group.add_argument("--all-blocks", action="store_true", help="OCR every detected block (default)")
+    parser.add_argument("--output-dir", default=ocr_engine.DEFAULTS["output_dir"])
+    parser.add_argument("--corrections", default="corrections.txt", help="global corrections file")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="OCR result cache directory")
+    parser.add_argument("--no-cache", action="store_true", help="always rerun Tesseract")
+    parser.add_argument("--profile", metavar="PATH", help="record per-image stage timings to PATH (.json, or .csv for the raw records)")
+    args = parser.parse_args()
+
+    profiling.enable(bool(args.profile))
+    image_paths = sorted({path for pattern in args.images for path in (glob.glob(pattern) or [pattern]) if os.path.isfile(path)})
+    if not image_paths:
+        print("No image files matched.")
+        sys.exit(1)
+
+    batch_process(image_paths, load_region_file(args.regions) if args.regions else None, args.output_dir,
+                  args.corrections, args.workers, None if args.no_cache else args.cache_dir)
+    if args.profile: profiling.report(args.profile)
@@ -0,0 +1,62 @@
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ocr_engine import CorrectionsMatcher
+from synthetic_pdf import WORDS
+
+def legacy_apply(text, corrections_map):
+    # The pre-CorrectionsMatcher loop: one compiled pattern and one re.sub per rule.
+    for find_str, replace_str in corrections_map.items():
+        text = re.sub(r'(?<!\w)' + re.escape(find_str) + r'(?!\w)', replace_str, text)
+    return text
+
+def make_rules(count, rng):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    rules = {}
+    while len(rules) < count:
+        # OCR-style confusions: a real word with one letter swapped, mapped back to the word
+        word = rng.choice(WORDS) + rng.choice(["", "s", "ed", "ing"])
+        pos = rng.randrange(len(word))
+        rules[word[:pos] + rng.choice(letters) + word[pos + 1:]] = word
+    return rules
+
+def make_book(pages, rng):
+    page_words = 420
+    vocabulary = WORDS + ["tbe", "wbich", "rnountain", "Chapter", "1st", "ist"]
+    return "\n\n".join(" ".join(rng.choice(vocabulary) for _ in range(page_words)) for _ in range(pages))
+
+def main():
+    parser = argparse.ArgumentParser(description="Global corrections: per-rule re.sub loop vs. CorrectionsMatcher.")
+    parser.add_argument("--rules", type=int, default=5000)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--skip-legacy", action="store_true", help="the legacy loop takes minutes at full size")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    rules = make_rules(args.rules, rng)
+    text = make_book(args.pages, rng)
+    print(f"{len(rules)} rules, {args.pages} pages, {len(text) / 1e6:.2f} MB of text")
+
+    start = time.perf_counter()
+    matcher = CorrectionsMatcher(rules)
+    compile_s = time.perf_counter() - start
+    start = time.perf_counter()
+    fast = matcher.apply(text)
+    apply_s = time.perf_counter() - start
+    print(f"CorrectionsMatcher: compile {compile_s:.3f}s, apply {apply_s:.3f}s")
+
+    if not args.skip_legacy:
+        start = time.perf_counter()
+        slow = legacy_apply(text, rules)
+        legacy_s = time.perf_counter() - start
+        print(f"per-rule re.sub:    apply {legacy_s:.3f}s ({legacy_s / apply_s:.0f}x slower)")
+        if slow != fast: print("NOTE: outputs differ (expected only where one rule rewrites another rule's output)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_pdf import make_illustrated_pdf
+
+def legacy_extract(pdf_path, output_dir):
+    # The serial version: findContours, a Python loop over every contour, PIL saves.
+    import cv2
+    import fitz
+    from pdf_render import render_page, array_to_image
+    os.makedirs(output_dir, exist_ok=True)
+    count = 0
+    for page_index, page in enumerate(fitz.open(pdf_path)):
+        pix, gray = render_page(page, dpi=300, gray=True)
+        _, thresh = cv2.threshold(gray, 200, 255, cv2.THRESH_BINARY_INV)
+        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        for i, cnt in enumerate(contours):
+            x, y, w, h = cv2.boundingRect(cnt)
+            if w > 100 and h > 100:
+                array_to_image(gray[y:y + h, x:x + w]).save(os.path.join(output_dir, f"page{page_index+1}_img{i+1}.png"))
+                count += 1
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="Illustration cropping: serial contour loop vs. the pooled pipeline.")
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--every", type=int, default=4, help="one illustrated page in this many")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    import contextlib, io
+    from detect_and_crop_illustrations import extract_illustrations
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = make_illustrated_pdf(os.path.join(tmp_dir, "illustrated.pdf"), args.pages, every=args.every)
+        runs = [("legacy", lambda out: legacy_extract(pdf_path, out)),
+                ("1 worker, no pre-pass", lambda out: extract_illustrations(pdf_path, out, 1, prepass_dpi=0)),
+                ("1 worker, pre-pass", lambda out: extract_illustrations(pdf_path, out, 1)),
+                (f"{args.workers} workers, pre-pass", lambda out: extract_illustrations(pdf_path, out, args.workers))]
+        print(f"{args.pages} pages, 1 in {args.every} illustrated")
+        print(f"{'run':>24} {'seconds':>8} {'ms/page':>8} {'crops':>6}")
+        for name, run in runs:
+            out_dir = os.path.join(tmp_dir, name.replace(" ", "_").replace(",", ""))
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()): run(out_dir)
+            elapsed = time.perf_counter() - start
+            print(f"{name:>24} {elapsed:>8.2f} {elapsed / args.pages * 1000:>8.1f} {len(os.listdir(out_dir)):>6}")
+
+if __name__ == "__main__":
+    main()
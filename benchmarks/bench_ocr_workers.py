@@ -0,0 +1,37 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ocr_pdf_to_text import ocr_pdf
+from synthetic_pdf import make_text_pdf
+
+def main():
+    parser = argparse.ArgumentParser(description="Pages/sec of ocr_pdf() at several worker counts.")
+    parser.add_argument("--pages", type=int, default=16)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = make_text_pdf(os.path.join(tmp_dir, "synthetic.pdf"), args.pages)
+        reference = None
+        print(f"{'workers':>8} {'seconds':>9} {'pages/sec':>10}")
+        for workers in args.workers:
+            out_path = os.path.join(tmp_dir, f"out_{workers}.txt")
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                ocr_pdf(pdf_path, out_path, workers=workers)
+            elapsed = time.perf_counter() - start
+            with open(out_path, encoding="utf-8") as f:
+                text = f.read()
+            if reference is None: reference = text
+            elif text != reference: print(f"WARNING: output with {workers} workers differs from the serial run")
+            print(f"{workers:>8} {elapsed:>9.2f} {args.pages / elapsed:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ocr_engine import clean_and_reflow_text, reflow_file
+from synthetic_pdf import WORDS
+
+def legacy_reflow(raw_text):
+    # The list-based clean_and_reflow_text this replaced, kept verbatim for comparison.
+    lines = raw_text.splitlines(); dehyphenated = []; i = 0; num_lines = len(lines)
+    while i < num_lines:
+        current_line_content = lines[i]; rstripped_line = current_line_content.rstrip()
+        if rstripped_line.endswith('-') and (i + 1) < num_lines:
+            next_line_original = lines[i+1]
+            if next_line_original.strip():
+                next_line_lstripped = next_line_original.lstrip(); is_continuation_candidate = False
+                if next_line_lstripped:
+                    first_char_next = next_line_lstripped[0]; part_before_hyphen_on_current = rstripped_line[:-1]
+                    if first_char_next.islower(): is_continuation_candidate = True
+                    elif first_char_next.isdigit():
+                        if part_before_hyphen_on_current and part_before_hyphen_on_current.isalnum(): is_continuation_candidate = True
+                if is_continuation_candidate:
+                    part_before_hyphen = rstripped_line[:-1]
+                    if '-' in part_before_hyphen: dehyphenated.append(rstripped_line + next_line_lstripped)
+                    else: dehyphenated.append(part_before_hyphen + next_line_lstripped)
+                    i += 2; continue
+                else: dehyphenated.append(rstripped_line); i += 1; continue
+            else: dehyphenated.append(rstripped_line); i += 2; continue
+        dehyphenated.append(rstripped_line); i += 1
+    reflowed_paragraphs_content = []; current_paragraph_lines = []
+    for line_entry in dehyphenated:
+        processed_line_for_paragraph = line_entry.strip()
+        if not processed_line_for_paragraph:
+            if current_paragraph_lines: reflowed_paragraphs_content.append(" ".join(current_paragraph_lines)); current_paragraph_lines = []
+            if not reflowed_paragraphs_content or reflowed_paragraphs_content[-1]: reflowed_paragraphs_content.append("")
+        else: current_paragraph_lines.append(processed_line_for_paragraph)
+    if current_paragraph_lines: reflowed_paragraphs_content.append(" ".join(current_paragraph_lines))
+    final_text_pieces = []
+    for k, p_content_block in enumerate(reflowed_paragraphs_content):
+        if p_content_block: final_text_pieces.append(p_content_block)
+        elif k > 0 and reflowed_paragraphs_content[k-1]: final_text_pieces.append("")
+    start_idx = 0;
+    while start_idx < len(final_text_pieces) and not final_text_pieces[start_idx]: start_idx += 1
+    end_idx = len(final_text_pieces);
+    while end_idx > start_idx and not final_text_pieces[end_idx-1]: end_idx -=1
+    return "\n\n".join(final_text_pieces[start_idx:end_idx])
+
+def make_ocr_text(megabytes, rng):
+    # Tesseract-like page text: ~60-column lines, some words hyphenated across
+    # lines, blank lines between paragraphs and "\f" after every page.
+    pages = []; size = 0; line_width = 60
+    while size < megabytes * 1024 * 1024:
+        lines = []
+        for _ in range(rng.randint(3, 6)):
+            line = ""
+            for _ in range(rng.randint(60, 160)):
+                word = rng.choice(WORDS)
+                if len(line) + len(word) + 1 > line_width:
+                    if len(word) > 5 and rng.random() < 0.3: lines.append(f"{line} {word[:3]}-".strip()); line = word[3:]
+                    else: lines.append(line); line = word
+                else: line = f"{line} {word}".strip()
+            lines.extend([line, ""])
+        page = "\n".join(lines) + "\n\f"
+        pages.append(page); size += len(page)
+    return "\n\n".join(pages)
+
+def timed(func, *args):
+    start = time.perf_counter(); result = func(*args)
+    return result, time.perf_counter() - start
+
+def peak_mb(func, *args):
+    tracemalloc.start(); func(*args); peak = tracemalloc.get_traced_memory()[1]; tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+def main():
+    parser = argparse.ArgumentParser(description="Reflow throughput and peak memory: list-based vs. streaming.")
+    parser.add_argument("--megabytes", type=float, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    text = make_ocr_text(args.megabytes, random.Random(args.seed))
+    size_mb = len(text.encode("utf-8")) / (1024 * 1024)
+    legacy, legacy_s = timed(legacy_reflow, text)
+    current, current_s = timed(clean_and_reflow_text, text)
+    assert current == legacy, "clean_and_reflow_text no longer matches the list-based version"
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        raw_path, out_path = os.path.join(tmp_dir, "book.txt"), os.path.join(tmp_dir, "book_reflowed.txt")
+        with open(raw_path, "w", encoding="utf-8") as f: f.write(text)
+        del text, legacy, current
+        _, file_s = timed(reflow_file, raw_path, out_path)
+        # Whole-text inputs are measured against the text already in memory; the file path holds only a chunk
+        with open(raw_path, "r", encoding="utf-8") as f: text = f.read()
+        runs = [("list-based", legacy_s, peak_mb(legacy_reflow, text)),
+                ("clean_and_reflow_text", current_s, peak_mb(clean_and_reflow_text, text)),
+                ("reflow_file (pages)", file_s, peak_mb(reflow_file, raw_path, out_path))]
+
+    print(f"{size_mb:.1f} MB of OCR text")
+    print(f"{'run':>22} {'seconds':>8} {'MB/s':>7} {'peak MB':>8}")
+    for name, seconds, peak in runs:
+        print(f"{name:>22} {seconds:>8.2f} {size_mb / seconds:>7.1f} {peak:>8.1f}")
+
+if __name__ == "__main__":
+    main()
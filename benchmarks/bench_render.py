@@ -0,0 +1,61 @@
+import argparse
+import io
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_pdf import make_text_pdf
+
+def render_png_roundtrip(page, dpi):
+    # The pre-pdf_render path: PNG encode, PNG decode, then a NumPy copy.
+    import numpy as np
+    from PIL import Image
+    pix = page.get_pixmap(dpi=dpi)
+    img = Image.open(io.BytesIO(pix.tobytes("png"))).convert("L")
+    return np.array(img)
+
+def render_samples(page, dpi, gray):
+    from pdf_render import render_page
+    pix, array = render_page(page, dpi=dpi, gray=gray)
+    return array.sum()  # touch every pixel while pix is still alive
+
+def run_mode(pdf_path, mode, dpi):
+    import fitz
+    doc = fitz.open(pdf_path)
+    start = time.perf_counter()
+    for page in doc:
+        if mode == "png": render_png_roundtrip(page, dpi)
+        else: render_samples(page, dpi, gray=(mode == "gray"))
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KiB on Linux
+    print(f"{mode},{elapsed / len(doc) * 1000:.1f},{peak_kb / 1024:.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-page render-to-array time and peak RSS.")
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--mode", choices=["png", "rgb", "gray"], help=argparse.SUPPRESS)
+    parser.add_argument("--pdf", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.pdf, args.mode, args.dpi)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = make_text_pdf(os.path.join(tmp_dir, "synthetic.pdf"), args.pages)
+        print(f"{'mode':>6} {'ms/page':>9} {'peak RSS MB':>12}")
+        for mode in ("png", "rgb", "gray"):
+            # A fresh interpreter per mode so ru_maxrss reflects only that mode.
+            out = subprocess.run([sys.executable, __file__, "--mode", mode, "--pdf", pdf_path, "--dpi", str(args.dpi)],
+                                 capture_output=True, text=True, check=True).stdout.strip()
+            name, ms, peak = out.split(",")
+            print(f"{name:>6} {float(ms):>9.1f} {float(peak):>12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+try:
+    import resource # Peak RSS; not available on Windows
+except ImportError:
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import profiling
+from synthetic_pdf import make_text_pdf, make_illustrated_pdf, make_scanned_pdf
+from bench_reflow import make_ocr_text
+
+# Reproducible suite over synthetic inputs generated offline: each case runs
+# in a fresh process with profiling on and records pages/sec, peak memory and
+# the per-stage totals. Save a run with --output and check a later one
+# against it with --compare.
+
+def _peak_rss_mb(who):
+    if resource is None: return None
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024 # Bytes on macOS, KiB elsewhere
+
+def case_render(inputs, out_dir, workers):
+    from pdf_render import render_page
+    import fitz
+    doc = fitz.open(inputs["text_pdf"])
+    for page_index in range(len(doc)):
+        with profiling.stage("render", page_index): render_page(doc.load_page(page_index), dpi=300, gray=True)
+    return len(doc)
+
+def case_triage(inputs, out_dir, workers):
+    from page_triage import triage_pdf
+    return len(triage_pdf(inputs["illustrated_pdf"], os.path.join(out_dir, "triage.jsonl")))
+
+def case_illustrations(inputs, out_dir, workers):
+    from detect_and_crop_illustrations import extract_illustrations
+    import fitz
+    extract_illustrations(inputs["illustrated_pdf"], out_dir, workers)
+    return len(fitz.open(inputs["illustrated_pdf"]))
+
+def case_extract_images(inputs, out_dir, workers):
+    from extract_images_from_pdf import extract_images
+    import fitz
+    extract_images(inputs["scanned_pdf"], out_dir)
+    return len(fitz.open(inputs["scanned_pdf"]))
+
+def case_reflow(inputs, out_dir, workers):
+    from ocr_engine import reflow_file
+    with profiling.stage("reflow"): reflow_file(inputs["ocr_text"], os.path.join(out_dir, "reflowed.txt"))
+    with open(inputs["ocr_text"], encoding="utf-8") as f: return f.read().count("\f")
+
+def case_ocr_pdf(inputs, out_dir, workers):
+    from ocr_pdf_to_text import ocr_pdf
+    import fitz
+    ocr_pdf(inputs["scanned_pdf"], os.path.join(out_dir, "book_ocr.txt"), workers=workers)
+    return len(fitz.open(inputs["scanned_pdf"]))
+
+CASES = {"render": case_render, "triage": case_triage, "illustrations": case_illustrations,
+         "extract_images": case_extract_images, "reflow": case_reflow, "ocr_pdf": case_ocr_pdf}
+
+def tesseract_available():
+    import pytesseract
+    return shutil.which(pytesseract.pytesseract.tesseract_cmd) is not None
+
+def _run_case(name, inputs, out_dir, workers, conn):
+    # Runs in a fresh process so peak memory belongs to this case alone
+    profiling.enable()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()): pages = CASES[name](inputs, out_dir, workers)
+    seconds = time.perf_counter() - start
+    summary = profiling.summary()
+    conn.send({"case": name, "workers": workers, "pages": pages, "seconds": round(seconds, 4), "pages_per_sec": round(pages / seconds, 3),
+               "peak_rss_mb": _peak_rss_mb(resource.RUSAGE_SELF) if resource else None,
+               "children_peak_rss_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+               "stages": {stage: {"count": total["count"], "seconds": total["seconds"] and round(total["seconds"], 4)} for stage, total in summary.items()}})
+    conn.close()
+
+def run_case(name, inputs, out_dir, workers):
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_run_case, args=(name, inputs, out_dir, workers, sender))
+    process.start(); sender.close()
+    try: result = receiver.recv()
+    except EOFError: result = None # The case crashed before sending anything
+    process.join()
+    return result or {"case": name, "workers": workers, "error": f"exit code {process.exitcode}"}
+
+def make_inputs(tmp_dir, pages, seed, megabytes):
+    inputs = {"text_pdf": make_text_pdf(os.path.join(tmp_dir, "text.pdf"), pages, seed),
+              "illustrated_pdf": make_illustrated_pdf(os.path.join(tmp_dir, "illustrated.pdf"), pages, seed),
+              "scanned_pdf": make_scanned_pdf(os.path.join(tmp_dir, "scanned.pdf"), pages, seed),
+              "ocr_text": os.path.join(tmp_dir, "ocr.txt")}
+    with open(inputs["ocr_text"], "w", encoding="utf-8") as f: f.write(make_ocr_text(megabytes, random.Random(seed)))
+    return inputs
+
+def compare(results, baseline, tolerance):
+    """Prints changes against a saved run; returns the cases that got slower or bigger beyond `tolerance`."""
+    previous = {(result["case"], result["workers"]): result for result in baseline["results"] if "error" not in result}
+    regressions = []
+    print(f"\n{'case':>16} {'workers':>7} {'pages/s':>9} {'change':>8} {'peak MB':>8} {'change':>8}")
+    for result in results:
+        old = previous.get((result["case"], result["workers"]))
+        if old is None or "error" in result: continue
+        speed = result["pages_per_sec"] / old["pages_per_sec"] - 1
+        memory = (result["peak_rss_mb"] / old["peak_rss_mb"] - 1) if result.get("peak_rss_mb") and old.get("peak_rss_mb") else 0.0
+        flag = " <-" if speed < -tolerance or memory > tolerance else ""
+        if flag: regressions.append(f"{result['case']} ({result['workers']} workers)")
+        print(f"{result['case']:>16} {result['workers']:>7} {result['pages_per_sec']:>9.2f} {speed:>+8.1%} {result.get('peak_rss_mb') or 0:>8.1f} {memory:>+8.1%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Pages/sec and peak memory of the pipeline stages on synthetic books.")
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES))
+    parser.add_argument("--pages", type=int, default=24)
+    parser.add_argument("--megabytes", type=float, default=5, help="size of the synthetic OCR text for the reflow case")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1], help="worker counts for the pooled cases")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case; the fastest is kept")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="save the results as JSON")
+    parser.add_argument("--compare", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="slowdown or memory growth that counts as a regression")
+    args = parser.parse_args()
+
+    cases = list(args.cases)
+    if "ocr_pdf" in cases and not tesseract_available():
+        print("Skipping ocr_pdf: tesseract is not installed."); cases.remove("ocr_pdf")
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        inputs = make_inputs(tmp_dir, args.pages, args.seed, args.megabytes)
+        print(f"{'case':>16} {'workers':>7} {'pages':>6} {'seconds':>8} {'pages/s':>9} {'peak MB':>8} {'workers MB':>10}")
+        for name in cases:
+            for workers in sorted(set(args.workers)) if name in ("illustrations", "ocr_pdf") else [1]:
+                out_dir = os.path.join(tmp_dir, f"{name}_{workers}"); os.makedirs(out_dir)
+                runs = [run_case(name, inputs, out_dir, workers) for _ in range(max(1, args.repeat))]
+                result = max(runs, key=lambda run: run.get("pages_per_sec", 0)); results.append(result)
+                if "error" in result: print(f"{name:>16} {workers:>7} failed ({result['error']})"); continue
+                print(f"{name:>16} {workers:>7} {result['pages']:>6} {result['seconds']:>8.2f} {result['pages_per_sec']:>9.2f} "
+                      f"{result['peak_rss_mb'] or 0:>8.1f} {result['children_peak_rss_mb'] or 0:>10.1f}")
+                shutil.rmtree(out_dir)
+
+    run = {"pages": args.pages, "repeat": args.repeat, "megabytes": args.megabytes, "seed": args.seed, "cpu_count": os.cpu_count(), "python": sys.version.split()[0], "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f: json.dump(run, f, indent=1)
+        print(f"Results saved to '{args.output}'")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f: baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions: print(f"Regressions: {', '.join(regressions)}"); sys.exit(1)
+
+if __name__ == "__main__":
+    main()
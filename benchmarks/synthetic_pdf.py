@@ -0,0 +1,77 @@
+import fitz  # PyMuPDF
+import os
+import random
+import sys
+
+WORDS = ("the of and to in that was his with for had which as by on not be at from "
+         "this it were all have are but they one been their so would when there more "
+         "said upon some into other them than these what only could great time after "
+         "river mountain history chapter voyage country ancient village journey").split()
+
+def make_text_pdf(path, pages=20, seed=0):
+    # Generates a reproducible book-like PDF entirely offline: pages of
+    # justified paragraphs with an occasional hyphenated line break.
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for page_number in range(pages):
+        page = doc.new_page(width=432, height=648)  # 6x9in trim size
+        paragraphs = []
+        for _ in range(rng.randint(3, 5)):
+            words = [rng.choice(WORDS) for _ in range(rng.randint(40, 90))]
+            paragraphs.append(" ".join(words).capitalize() + ".")
+        body = "\n\n".join(paragraphs)
+        page.insert_textbox(fitz.Rect(48, 48, 384, 600), body, fontsize=10, fontname="times-roman", align=fitz.TEXT_ALIGN_JUSTIFY)
+        page.insert_text((208, 624), str(page_number + 1), fontsize=9, fontname="times-roman")
+    doc.save(path)
+    doc.close()
+    return path
+
+def make_illustrated_pdf(path, pages=20, seed=0, every=4):
+    # Like make_text_pdf, but every `every`-th page carries a line drawing
+    # (framed figure with shapes and a hatched fill) above a shorter text block.
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for page_number in range(pages):
+        page = doc.new_page(width=432, height=648)
+        text_top = 48
+        if page_number % every == 0:
+            left, top = rng.randint(48, 120), 60; width, height = rng.randint(180, 260), rng.randint(150, 220)
+            frame = fitz.Rect(left, top, left + width, top + height)
+            page.draw_rect(frame, color=(0, 0, 0), width=1.5)
+            page.draw_circle(frame.tl + (width * 0.35, height * 0.45), min(width, height) * 0.25, color=(0, 0, 0), width=0.8)
+            for k in range(12): # Thin hatching, the kind that fades at low dpi
+                x = frame.x0 + width * 0.55 + k * 5
+                page.draw_line((x, frame.y0 + 20), (x - 20, frame.y1 - 20), color=(0, 0, 0), width=0.3)
+            page.insert_text((left, frame.y1 + 14), f"Fig. {page_number // every + 1}.", fontsize=9, fontname="times-italic")
+            text_top = frame.y1 + 30
+        words = [rng.choice(WORDS) for _ in range(rng.randint(120, 260))]
+        page.insert_textbox(fitz.Rect(48, text_top, 384, 600), " ".join(words).capitalize() + ".", fontsize=10,
+                            fontname="times-roman", align=fitz.TEXT_ALIGN_JUSTIFY)
+        page.insert_text((208, 624), str(page_number + 1), fontsize=9, fontname="times-roman")
+    doc.save(path)
+    doc.close()
+    return path
+
+def make_scanned_pdf(path, pages=20, seed=0, dpi=150):
+    # An image-only "scan" of make_text_pdf's pages, one grayscale image per
+    # page plus a small ornament image shared by every page (one xref).
+    with open(make_text_pdf(path, pages, seed), "rb") as f: # Overwritten below
+        text_doc = fitz.open(stream=f.read(), filetype="pdf")
+    ornament = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 64, 16), False); ornament.clear_with(96)
+    doc = fitz.open(); ornament_xref = 0
+    for text_page in text_doc:
+        page = doc.new_page(width=text_page.rect.width, height=text_page.rect.height)
+        page.insert_image(page.rect, pixmap=text_page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY))
+        ornament_xref = page.insert_image(fitz.Rect(184, 20, 248, 36), pixmap=ornament, xref=ornament_xref)
+    doc.save(path, deflate=True)
+    doc.close(); text_doc.close()
+    return path
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python benchmarks/synthetic_pdf.py <output.pdf> [pages]")
+        sys.exit(1)
+    out_path = sys.argv[1]
+    page_total = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    make_text_pdf(out_path, page_total)
+    print(f"Wrote {page_total} synthetic pages to '{os.path.abspath(out_path)}'")
@@ -1,37 +1,138 @@
 import fitz  # PyMuPDF
+import argparse
+import json
 import os
-import sys
+import shutil
+import time
+import profiling
+from concurrent.futures import ThreadPoolExecutor
 
-def extract_images(pdf_path, output_dir):
+MANIFEST_NAME = "manifest.json"
+
+def _write_file(path, data, page_index):
+    with profiling.stage("write", page_index), open(path, "wb") as f:
+        f.write(data)
+
+def _duplicate_file(src, dst, mode):
+    # Returns how the duplicate was materialised: "link", "copy" or "manifest" (no file)
+    if mode == "manifest": return "manifest"
+    if os.path.exists(dst): os.remove(dst)
+    if mode == "link":
+        try:
+            os.link(src, dst)
+            return "link"
+        except OSError:
+            pass  # e.g. FAT/exFAT or a filesystem without hard links
+    shutil.copyfile(src, dst)
+    return "copy"
+
+def image_filename(page_number, img_index, ext):
+    return f"page{page_number+1}_img{img_index+1}.{ext}"
+
+def image_entry(xref, filename, base_image):
+    return {"xref": xref, "file": filename, "ext": base_image["ext"], "width": base_image["width"],
+            "height": base_image["height"], "bytes": len(base_image["image"])}
+
+def first_occurrences(doc):
+    """{xref: (page_number, img_index)} of the first place each image is used, without decoding any."""
+    first = {}
+    for page_number in range(len(doc)):
+        for img_index, img in enumerate(doc[page_number].get_images(full=True)): first.setdefault(img[0], (page_number, img_index))
+    return first
+
+def extract_page_images(doc, page_number, output_dir, first, write=_write_file):
+    """Writes the images first used on this page (per `first_occurrences`) through write(path, data, page_number).
+
+    Returns [[img_index, xref, image entry or None for a repeat], ...] for
+    every image on the page; assemble_pages turns these back into what
+    extract_images records.
+    """
+    results = []
+    for img_index, img in enumerate(doc[page_number].get_images(full=True)):
+        xref = img[0]
+        if first.get(xref) != (page_number, img_index): results.append([img_index, xref, None]); continue
+        with profiling.stage("extract", page_number): base_image = doc.extract_image(xref)
+        filename = image_filename(page_number, img_index, base_image["ext"])
+        write(os.path.join(output_dir, filename), base_image["image"], page_number)
+        results.append([img_index, xref, image_entry(xref, filename, base_image)])
+    return results
+
+def assemble_pages(page_results):
+    """Rebuilds (images, pages, repeats) from extract_page_images results listed in page order."""
+    images = {}; pages = []; repeats = []
+    for page_number, results in enumerate(page_results):
+        page_entry = {"page": page_number + 1, "images": []}
+        pages.append(page_entry)
+        for img_index, xref, first_entry in results:
+            first = images.get(xref)
+            if first is None: images[xref] = first = first_entry
+            filename = image_filename(page_number, img_index, first["ext"])
+            entry = {"xref": xref, "file": filename}
+            page_entry["images"].append(entry)
+            if first_entry is None:
+                entry["duplicate_of"] = first["file"]
+                repeats.append((first["file"], filename, entry))
+    return images, pages, repeats
+
+def finish_extraction(pdf_path, output_dir, page_count, images, pages, repeats, duplicates):
+    """Materialises the repeats and writes manifest.json, once every first occurrence is on disk."""
+    for first_file, filename, entry in repeats:
+        with profiling.stage("duplicate"):
+            how = _duplicate_file(os.path.join(output_dir, first_file), os.path.join(output_dir, filename), duplicates)
+        if how == "manifest": entry["file"] = first_file
+        else: print(f"Saved: {os.path.join(output_dir, filename)} ({how} of {first_file})")
+
+    manifest = {"pdf": os.path.abspath(pdf_path), "page_count": page_count, "duplicates": duplicates,
+                "images": sorted(images.values(), key=lambda image: image["xref"]), "pages": pages}
+    with open(os.path.join(output_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+
+def extract_images(pdf_path, output_dir, threads=4, duplicates="link"):
+    """Writes each embedded image once, plus a manifest.json mapping pages to images.
+
+    An image (xref) used on several pages is extracted only the first time;
+    later occurrences become hard links to that file (`duplicates="link"`,
+    falling back to copies), plain copies ("copy"), or only manifest entries
+    ("manifest").
+    """
+    start_time = time.perf_counter()
     os.makedirs(output_dir, exist_ok=True)
     doc = fitz.open(pdf_path)
-    image_count = 0
+    first = first_occurrences(doc)
 
-    for page_number in range(len(doc)):
-        page = doc[page_number]
-        image_list = page.get_images(full=True)
-        
-        for img_index, img in enumerate(image_list):
-            xref = img[0]
-            base_image = doc.extract_image(xref)
-            image_bytes = base_image["image"]
-            image_ext = base_image["ext"]
-            image_filename = f"page{page_number+1}_img{img_index+1}.{image_ext}"
-            output_path = os.path.join(output_dir, image_filename)
-            
-            with open(output_path, "wb") as f:
-                f.write(image_bytes)
-            image_count += 1
-            print(f"Saved: {output_path}")
-
-    print(f"✅ Done. Extracted {image_count} images to: {output_dir}")
+    # PyMuPDF is not thread-safe, so extraction stays on this thread; the
+    # pool only writes bytes, overlapping disk I/O with the next extraction.
+    with ThreadPoolExecutor(max_workers=threads) as writer:
+        pending = []
+        def write(path, data, page_number): #_
+            pending.append((path, writer.submit(_write_file, path, data, page_number)))
+            # Report writes in order and keep only a bounded number of images in memory
+            while pending and (pending[0][1].done() or len(pending) > 4 * threads):
+                done_path, future = pending.pop(0)
+                future.result(); print(f"Saved: {done_path}")
+        page_results = [extract_page_images(doc, page_number, output_dir, first, write) for page_number in range(len(doc))]
+        for path, future in pending:
+            future.result(); print(f"Saved: {path}")
+    images, pages, repeats = assemble_pages(page_results)
+
+    # Every first occurrence is on disk now, so repeats can point at it
+    finish_extraction(pdf_path, output_dir, len(doc), images, pages, repeats, duplicates)
+    profiling.add("extract_images", time.perf_counter() - start_time, count=len(doc))
+
+    print(f"✅ Done. Extracted {len(images)} unique images ({len(repeats)} repeats) to: {output_dir}")
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python extract_images_from_pdf.py <input.pdf> [output_dir]")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(usage="python extract_images_from_pdf.py <input.pdf> [output_dir] [--duplicates link|copy|manifest] [--profile timings.json]")
+    parser.add_argument("pdf_path")
+    parser.add_argument("output_dir", nargs="?")
+    parser.add_argument("--threads", type=int, default=4, help="threads writing image files")
+    parser.add_argument("--duplicates", choices=["link", "copy", "manifest"], default="link",
+                        help="how to store an image repeated on later pages (default: hard link)")
+    parser.add_argument("--profile", metavar="PATH", help="record per-image stage timings to PATH (.json, or .csv for the raw records)")
+    args = parser.parse_args()
 
-    pdf_path = sys.argv[1]
-    output_dir = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(pdf_path)[0] + "_images"
+    output_dir = args.output_dir or os.path.splitext(args.pdf_path)[0] + "_images"
 
-    extract_images(pdf_path, output_dir)
+    profiling.enable(bool(args.profile))
+    extract_images(args.pdf_path, output_dir, max(1, args.threads), args.duplicates)
+    if args.profile: profiling.report(args.profile)
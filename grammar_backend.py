@@ -0,0 +1,154 @@
+import hashlib
+import http.client
+import json
+import os
+import re
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+# Grammar correction through a running Ollama server (`ollama serve`) instead
+# of a fresh `ollama run` per click: the model stays loaded between requests,
+# text is sent in paragraph chunks several at a time, and chunks that were
+# already corrected are answered from a cache keyed by their hash.
+
+DEFAULT_URL = "http://localhost:11434"
+DEFAULT_MODEL = "llama3"
+GRAMMAR_PROMPT = ("Correct the grammar and punctuation of the following historical text.\n"
+                  "Do not paraphrase or simplify. Preserve technical phrases and original meaning:\n\n")
+REGION_HEADER = re.compile(r"--- Region \d+ \([^)\n]*\) ---(?:\n|$)")
+
+class GrammarBackendError(Exception):
+    pass
+
+def server_url():
+    # Same variable the ollama CLI reads; it may be given without a scheme
+    url = os.environ.get("OLLAMA_HOST") or DEFAULT_URL
+    return url if "://" in url else "http://" + url
+
+def split_chunks(text, max_chars=1500):
+    """Splits text into [(segment, needs_correction), ...] that join back to `text`.
+
+    Paragraphs are the "\\n\\n"-separated blocks clean_and_reflow_text
+    produces; consecutive ones are grouped up to `max_chars`. Separators and
+    the "--- Region N (...) ---" headers of the combined editor are kept as
+    segments of their own, so they are never sent to the model.
+    """
+    segments = []; chunk = ""; pending_separator = ""
+    def flush(): #_
+        nonlocal chunk, pending_separator
+        if chunk: segments.append((chunk, True))
+        if pending_separator: segments.append((pending_separator, False))
+        chunk = pending_separator = ""
+    for piece in re.split(r"(\n\s*\n)", text):
+        if not piece: continue
+        if not piece.strip(): # Paragraph separator
+            if chunk: pending_separator += piece
+            else: segments.append((piece, False))
+            continue
+        header = REGION_HEADER.match(piece)
+        if header:
+            flush(); segments.append((header.group(0), False)); piece = piece[header.end():]
+            if not piece: continue
+        if chunk and len(chunk) + len(pending_separator) + len(piece) <= max_chars:
+            chunk += pending_separator + piece; pending_separator = ""
+        else: flush(); chunk = piece
+    flush()
+    return segments
+
+class OllamaClient:
+    """Minimal client for Ollama's /api/generate, keeping one HTTP connection per thread."""
+
+    def __init__(self, url=None, model=DEFAULT_MODEL, timeout=600, keep_alive="30m"):
+        parsed = urllib.parse.urlsplit(url or server_url())
+        self.scheme, self.host, self.port = parsed.scheme, parsed.hostname, parsed.port
+        self.model = model; self.timeout = timeout; self.keep_alive = keep_alive
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            conn = self._local.conn = conn_class(self.host, self.port, timeout=self.timeout)
+        return conn
+
+    def _post(self, path, payload):
+        body = json.dumps(payload).encode("utf-8")
+        for attempt in (1, 2): # Retry once if the server dropped an idle keep-alive connection
+            conn = self._connection()
+            try:
+                conn.request("POST", path, body, {"Content-Type": "application/json"})
+                response = conn.getresponse(); data = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as e:
+                conn.close(); self._local.conn = None
+                if attempt == 2: raise GrammarBackendError(f"Connection to {self.host}:{self.port} lost: {e}")
+                continue
+            except OSError as e:
+                conn.close(); self._local.conn = None
+                raise GrammarBackendError(f"Cannot reach Ollama at {self.host}:{self.port}: {e}. Is 'ollama serve' running?")
+            if response.status != 200:
+                raise GrammarBackendError(f"Ollama returned HTTP {response.status}: {data.decode('utf-8', 'replace').strip()}")
+            return json.loads(data)
+
+    def generate(self, prompt):
+        return self._post("/api/generate", {"model": self.model, "prompt": prompt, "stream": False,
+                                            "keep_alive": self.keep_alive})["response"]
+
+class GrammarCorrector:
+    """Corrects text chunk by chunk on a small thread pool.
+
+    Results are cached by the hash of the chunk's text (corrected output
+    included, so re-checking a corrected chunk costs nothing); the cache
+    lives as long as the corrector, i.e. the GUI session.
+    """
+
+    def __init__(self, client=None, workers=3):
+        self.client = client or OllamaClient()
+        self.workers = workers
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def _key(self, chunk):
+        return hashlib.sha256(f"{self.client.model}\0{GRAMMAR_PROMPT}\0{chunk}".encode("utf-8")).hexdigest()
+
+    def cached(self, chunk):
+        with self._lock: return self._cache.get(self._key(chunk))
+
+    def correct_chunk(self, chunk):
+        corrected = self.cached(chunk)
+        if corrected is None:
+            corrected = self.client.generate(GRAMMAR_PROMPT + chunk).strip() or chunk
+            with self._lock: self._cache[self._key(chunk)] = corrected; self._cache[self._key(corrected)] = corrected
+        return corrected
+
+    def correct_async(self, chunks, on_result, on_done=None):
+        """Corrects [(index, chunk), ...] in parallel, calling on_result(index, corrected, error) as each finishes.
+
+        Callbacks run on worker threads (cache hits on the calling thread).
+        Returns the executor; shut it down with cancel_futures=True to stop
+        early. on_done() runs once every chunk has been reported.
+        """
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        remaining = [len(chunks)]; lock = threading.Lock()
+        def report(index, corrected, error): #_
+            on_result(index, corrected, error)
+            with lock: remaining[0] -= 1; finished = remaining[0] == 0
+            if finished and on_done: on_done()
+        def run(index, chunk): #_
+            try: corrected, error = self.correct_chunk(chunk), None
+            except Exception as e: corrected, error = None, e
+            report(index, corrected, error)
+        for index, chunk in chunks:
+            corrected = self.cached(chunk)
+            if corrected is not None: report(index, corrected, None)
+            else: executor.submit(run, index, chunk)
+        if not chunks and on_done: on_done()
+        executor.shutdown(wait=False)
+        return executor
+
+    def correct_text(self, text):
+        """Blocking helper: returns the whole text with every chunk corrected."""
+        segments = split_chunks(text)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self.correct_chunk, segment) if needs_correction else None for segment, needs_correction in segments]
+            return "".join(future.result() if future else segment for future, (segment, _needs) in zip(futures, segments))
@@ -0,0 +1,144 @@
+import functools
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import numpy as np
+import pytesseract
+from pytesseract import Output
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "scanned_books_rebuild", "ocr")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+@functools.lru_cache(maxsize=None)
+def tesseract_version():
+    return str(pytesseract.get_tesseract_version())
+
+def image_digest(image):
+    """Hash of an image's pixels (NumPy array or PIL image), shape and dtype included."""
+    arr = np.ascontiguousarray(np.asarray(image))
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f"{arr.shape}|{arr.dtype}|".encode("ascii"))
+    h.update(arr.data)
+    return h.hexdigest()
+
+def string_and_data(image):
+    """Returns (text, image_to_data dict) for the default config, from one Tesseract run."""
+    text, tsv = pytesseract.run_and_get_multiple_output(image, extensions=["txt", "tsv"])
+    return text, pytesseract.pytesseract.file_to_dict(tsv, "\t", -1)
+
+class OCRCache:
+    """On-disk Tesseract result cache with a size cap and LRU eviction.
+
+    Entries are keyed by image pixels, crop box, Tesseract config and
+    Tesseract version (plus the engine, for results not from the tesseract
+    CLI), so it can be shared by every tool and every process.
+    Recency is tracked through file mtimes, which are bumped on each hit.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._total_bytes = None
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, digest, box=None, config="", kind="string", engine=None):
+        parts = [digest, list(box) if box is not None else None, config, kind, tesseract_version()]
+        if engine: parts.append(engine) # CLI keys stay as they were
+        raw = json.dumps(parts)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f: value = json.load(f)
+            os.utime(path)  # mark as recently used
+        except (OSError, ValueError):
+            with self._lock: self.misses += 1
+            return None
+        with self._lock: self.hits += 1
+        return value
+
+    def put(self, key, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps(value).encode("utf-8")
+        # Write-then-rename so concurrent readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f: f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: could not write OCR cache entry '{path}': {e}")
+            if os.path.exists(tmp_path): os.remove(tmp_path)
+            return
+        with self._lock:
+            if self._total_bytes is None: self._total_bytes = self._scan_size()
+            else: self._total_bytes += len(data)
+            over_cap = self._total_bytes > self.max_bytes
+        if over_cap: self.evict()
+
+    def _entries(self):
+        for dirpath, _dirnames, filenames in os.walk(self.cache_dir):
+            for name in filenames:
+                if not name.endswith(".json"): continue
+                path = os.path.join(dirpath, name)
+                try: st = os.stat(path)
+                except OSError: continue  # evicted by another process
+                yield st.st_mtime, st.st_size, path
+
+    def _scan_size(self):
+        return sum(size for _mtime, size, _path in self._entries())
+
+    def evict(self):
+        # Rescan rather than trust the running total: other processes share the directory.
+        entries = sorted(self._entries())
+        total = sum(size for _mtime, size, _path in entries)
+        target = int(self.max_bytes * 0.9)
+        for _mtime, size, path in entries:
+            if total <= target: break
+            try: os.remove(path)
+            except OSError: continue
+            total -= size
+        with self._lock: self._total_bytes = total
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+    def summary(self):
+        return f"OCR cache: {self.hits} hits, {self.misses} misses"
+
+    def image_to_string(self, image, config="", box=None, digest=None):
+        # With `digest` given (the hash of the full page), `image` is the crop at `box`.
+        key = self.key(digest or image_digest(image), box, config, "string")
+        text = self.get(key)
+        if text is None:
+            text = pytesseract.image_to_string(image, config=config)
+            self.put(key, text)
+        return text
+
+    def image_to_data(self, image, config="", box=None, digest=None):
+        key = self.key(digest or image_digest(image), box, config, "data")
+        data = self.get(key)
+        if data is None:
+            data = pytesseract.image_to_data(image, config=config, output_type=Output.DICT)
+            self.put(key, data)
+        return data
+
+    def image_to_string_and_data(self, image, box=None, digest=None):
+        # Text and word boxes from a single Tesseract run, stored under the
+        # same keys image_to_string and image_to_data use.
+        digest = digest or image_digest(image)
+        string_key, data_key = self.key(digest, box, "", "string"), self.key(digest, box, "", "data")
+        text, data = self.get(string_key), self.get(data_key)
+        if text is None or data is None:
+            text, data = string_and_data(image)
+            self.put(string_key, text); self.put(data_key, data)
+        return text, data
@@ -0,0 +1,545 @@
+import os
+import pytesseract
+from pytesseract import Output
+from PIL import Image
+import numpy as np
+import re
+import bisect
+import shlex
+import subprocess
+import tempfile
+import threading
+import profiling
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import tesserocr # Optional: a persistent in-process Tesseract handle for region batches
+except ImportError:
+    tesserocr = None
+
+# GUI-free OCR pipeline shared by tesseract_select_text_regions16.py and
+# batch_select_regions.py: block detection, region OCR, corrections, reflow.
+
+DEFAULTS = {
+    "ocr_confidence_threshold": 30,
+    "block_padding": 3,
+    "region_config": "--psm 6",
+    "page_config": "--psm 1",
+    "page_band_height": 1000, "page_band_overlap": 150, # Bands of the page pass; shared so every tool gets the same block ids
+    "output_dir": "ocr_outputs",
+}
+
+CORRECTIONS_HEADER = "# Global Corrections: Use format 'find_string = replace_string'\n"
+
+# --- TEXT CLEANUP ---
+PAGE_BREAK = object() # Marks a page boundary in a line stream
+PARAGRAPH_SEPARATOR = "\n\n\n\n"
+_LINE_BREAKS = frozenset("\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029") # What str.splitlines splits on
+
+def iter_text_lines(chunks, page_break=None):
+    """Yields the lines of text arriving in chunks, exactly as str.splitlines would split the whole.
+
+    With `page_break` (e.g. "\f", which Tesseract puts after every page),
+    that character yields PAGE_BREAK instead of ending a line.
+    """
+    carry = ""; skip_lf = False
+    for chunk in chunks:
+        parts = chunk.split(page_break) if page_break else (chunk,)
+        for k, part in enumerate(parts):
+            if k:
+                if carry: yield carry
+                carry = ""; skip_lf = False
+                yield PAGE_BREAK
+            if skip_lf and part:
+                skip_lf = False
+                if part[0] == "\n": part = part[1:] # Second half of a "\r\n" split across chunks
+            text = carry + part
+            if not text: continue
+            lines = text.splitlines(); last = text[-1]
+            if last == "\r": carry = ""; skip_lf = True
+            elif last in _LINE_BREAKS: carry = ""
+            else: carry = lines.pop()
+            yield from lines
+    if carry: yield carry
+
+def iter_page_lines(pages):
+    """Yields the lines of each page text, with PAGE_BREAK between pages."""
+    for page_index, page_text in enumerate(pages):
+        if page_index: yield PAGE_BREAK
+        yield from page_text.splitlines()
+
+def _join_pages(lines):
+    # Drops the blank lines around a page break that follows a hyphenated
+    # line, so the word continues onto the next page; any other page break
+    # ends the paragraph.
+    blank_lines = 0; ends_with_hyphen = False; skip_leading_blanks = False
+    for line in lines:
+        if line is PAGE_BREAK:
+            if ends_with_hyphen: blank_lines = 0; skip_leading_blanks = True
+            else: blank_lines += 1
+            continue
+        if not line.strip():
+            if not skip_leading_blanks: blank_lines += 1
+            continue
+        for _ in range(blank_lines): yield ""
+        blank_lines = 0; skip_leading_blanks = False
+        yield line; ends_with_hyphen = line.rstrip().endswith('-')
+    for _ in range(blank_lines): yield ""
+
+def _dehyphenate(lines):
+    previous = None
+    for line in lines:
+        if previous is None: previous = line; continue
+        rstripped_line = previous.rstrip()
+        if rstripped_line.endswith('-'):
+            if line.strip():
+                next_line_lstripped = line.lstrip(); first_char_next = next_line_lstripped[0]
+                part_before_hyphen = rstripped_line[:-1]
+                if first_char_next.islower() or (first_char_next.isdigit() and part_before_hyphen and part_before_hyphen.isalnum()):
+                    if '-' in part_before_hyphen: yield rstripped_line + next_line_lstripped
+                    else: yield part_before_hyphen + next_line_lstripped
+                    previous = None; continue
+            else: yield rstripped_line; previous = None; continue # The blank line after a trailing hyphen is dropped
+        yield rstripped_line; previous = line
+    if previous is not None: yield previous.rstrip()
+
+def iter_reflowed_paragraphs(lines, pages=True):
+    """Dehyphenates and reflows a stream of lines, yielding one paragraph at a time.
+
+    Lines may include PAGE_BREAK markers (see iter_text_lines and
+    iter_page_lines) unless `pages` is False. Only the current paragraph is
+    held in memory.
+    """
+    current_paragraph_lines = []
+    for line in _dehyphenate(_join_pages(lines) if pages else lines):
+        line = line.strip()
+        if line: current_paragraph_lines.append(line)
+        elif current_paragraph_lines: yield " ".join(current_paragraph_lines); current_paragraph_lines = []
+    if current_paragraph_lines: yield " ".join(current_paragraph_lines)
+
+def clean_and_reflow_text(raw_text):
+    return PARAGRAPH_SEPARATOR.join(iter_reflowed_paragraphs(raw_text.splitlines(), pages=False))
+
+def reflow_file(input_path, output_path, page_break="\f", chunk_size=1 << 20):
+    """Reflows a whole text file (e.g. ocr_pdf output) in constant memory; returns the paragraph count."""
+    count = 0
+    with open(input_path, "r", encoding="utf-8") as src, open(output_path, "w", encoding="utf-8") as out:
+        chunks = iter(lambda: src.read(chunk_size), "")
+        for paragraph in iter_reflowed_paragraphs(iter_text_lines(chunks, page_break)):
+            if count: out.write(PARAGRAPH_SEPARATOR)
+            out.write(paragraph); count += 1
+    return count
+
+# --- GLOBAL CORRECTIONS ---
+def parse_corrections(lines, source_name=None):
+    """Parses 'find = replace' lines into an ordered map.
+
+    With `source_name` set, malformed lines are reported; otherwise they are
+    skipped silently (as when saving from the editor).
+    """
+    corrections_map = {}
+    for line_num, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if '=' in line:
+            parts = line.split('=', 1)
+            find_str = parts[0].strip()
+            replace_str = parts[1].strip()
+            if find_str: # Ensure find_str is not empty
+                corrections_map[find_str] = replace_str
+            elif source_name:
+                print(f"Warning: Empty find string in '{source_name}' at line {line_num}: '{line}'")
+        elif source_name:
+            print(f"Warning: Invalid format in '{source_name}' at line {line_num} (missing '='): '{line}'")
+    return corrections_map
+
+def read_corrections_file(corrections_file):
+    """Returns the corrections map from `corrections_file`, creating an example file if missing."""
+    if not os.path.exists(corrections_file):
+        try:
+            with open(corrections_file, "w", encoding="utf-8") as f:
+                f.write(CORRECTIONS_HEADER)
+                f.write("# Example: teh = the\n")
+                f.write("# Example: ist = 1st\n")
+            print(f"'{corrections_file}' created with examples.")
+        except IOError as e:
+            print(f"Error creating '{corrections_file}': {e}")
+            return {}
+    try:
+        with open(corrections_file, "r", encoding="utf-8") as f:
+            return parse_corrections(f, corrections_file)
+    except IOError as e:
+        print(f"Error reading '{corrections_file}': {e}")
+        return {}
+
+_WORD_CHAR = re.compile(r'\w')
+
+class CorrectionsMatcher:
+    """The global corrections compiled into a character trie and applied in one pass.
+
+    Matches what running re.sub(r'(?<!\w)find(?!\w)', replace) per rule
+    did: whole word/phrase, case-sensitive, and when matches of several rules
+    overlap the first-defined rule wins, wherever each starts. Text produced
+    by a replacement is not scanned again.
+    """
+
+    def __init__(self, corrections_map):
+        self.corrections_map = dict(corrections_map)
+        self._trie = {}
+        for rule_index, (find_str, replace_str) in enumerate(self.corrections_map.items()):
+            try:
+                # Expand the replacement template once, exactly as the per-rule re.sub did
+                if '\\' not in replace_str: replacement = replace_str
+                else: replacement = re.sub(r'(?<!\w)' + re.escape(find_str) + r'(?!\w)', replace_str, find_str, count=1)
+            except re.error as e:
+                print(f"Regex error for rule ['{find_str}' = '{replace_str}']: {e}. Skipping this rule.")
+                continue
+            node = self._trie
+            for char in find_str: node = node.setdefault(char, {})
+            node.setdefault(None, (rule_index, replacement)) # None marks the end of a rule
+        first_chars = "".join(sorted(char for char in self._trie if char is not None))
+        # Candidate match starts: a rule's first character not preceded by a word character
+        self._start_re = re.compile(r'(?<!\w)[' + re.escape(first_chars) + ']') if first_chars else None
+
+    def __len__(self):
+        return len(self.corrections_map)
+
+    def apply(self, text):
+        if self._start_re is None: return text
+        word_char_at = _WORD_CHAR.match; text_len = len(text)
+        matches = [] # (rule_index, start, end, replacement) of every whole-word match
+        for match in self._start_re.finditer(text):
+            start = match.start(); node = self._trie; pos = start
+            while pos < text_len:
+                node = node.get(text[pos])
+                if node is None: break
+                pos += 1
+                rule = node.get(None)
+                if rule and not word_char_at(text, pos): matches.append((rule[0], start, pos, rule[1]))
+        if not matches: return text
+        # Rules claim their spans in definition order, leftmost first within a rule, as the per-rule re.sub calls did
+        matches.sort(key=lambda m: (m[0], m[1]))
+        starts = []; ends = []; replacements = [] # Accepted spans, sorted by start
+        for _rule_index, start, end, replacement in matches:
+            i = bisect.bisect_left(starts, start)
+            if (i and ends[i - 1] > start) or (i < len(starts) and starts[i] < end): continue
+            starts.insert(i, start); ends.insert(i, end); replacements.insert(i, replacement)
+        pieces = []; last_end = 0
+        for start, end, replacement in zip(starts, ends, replacements):
+            pieces.append(text[last_end:start]); pieces.append(replacement); last_end = end
+        pieces.append(text[last_end:])
+        return "".join(pieces)
+
+def apply_global_corrections(text, corrections):
+    """Applies a CorrectionsMatcher (or a plain map, compiled on the fly) to `text`."""
+    if not corrections:
+        return text
+    if not isinstance(corrections, CorrectionsMatcher): corrections = CorrectionsMatcher(corrections)
+    return corrections.apply(text)
+
+# --- OCR ---
+class WordTable:
+    """Word-level results of the page pass, stored column-wise.
+
+    `boxes` (N x 4 int32 left/top/width/height), `conf` (float32) and `text`
+    are sorted by (block, par, line, word), so each line-level block id owns
+    the contiguous slice recorded in `line_slices`. Words are kept when
+    their confidence is above `conf_threshold`, compared as in
+    blocks_from_ocr_data; pass the blocks' threshold so a block's text holds
+    only the words its rectangle covers. The default keeps every recognised word.
+    """
+
+    def __init__(self, ocr_data, conf_threshold=-1):
+        rows = sorted((i for i in range(len(ocr_data['text'])) if str(ocr_data['text'][i]).strip() and int(float(ocr_data['conf'][i])) > conf_threshold),
+                      key=lambda i: (ocr_data['block_num'][i], ocr_data['par_num'][i], ocr_data['line_num'][i], ocr_data['word_num'][i]))
+        self.boxes = np.array([(ocr_data['left'][i], ocr_data['top'][i], ocr_data['width'][i], ocr_data['height'][i]) for i in rows], dtype=np.int32).reshape(-1, 4)
+        self.conf = np.array([float(ocr_data['conf'][i]) for i in rows], dtype=np.float32)
+        self.text = [str(ocr_data['text'][i]).strip() for i in rows]
+        self.line_slices = {}
+        for pos, i in enumerate(rows):
+            block_id = (ocr_data['block_num'][i], ocr_data['par_num'][i], ocr_data['line_num'][i])
+            start, _end = self.line_slices.get(block_id, (pos, pos))
+            self.line_slices[block_id] = (start, pos + 1)
+
+    def __len__(self):
+        return len(self.text)
+
+    def line_text(self, block_id):
+        start, end = self.line_slices.get(block_id, (0, 0))
+        return " ".join(self.text[start:end]) + "\n"
+
+    def texts_for(self, block_ids):
+        """{source_id: text} for the given block ids, ready to skip re-OCR."""
+        return {block_source_id(block_id): self.line_text(block_id) for block_id in block_ids if block_id in self.line_slices}
+
+def block_source_id(block_id):
+    return f"tess_{block_id[0]}_{block_id[1]}_{block_id[2]}" # Include line_num if present
+
+def blocks_from_ocr_data(ocr_data, conf_threshold=DEFAULTS["ocr_confidence_threshold"]):
+    """Merges confident words into line boxes: {(block, par, line): (x1, y1, x2, y2)}."""
+    block_coords = {}
+    for i in range(len(ocr_data['text'])):
+        if int(float(ocr_data['conf'][i])) > conf_threshold:
+            text = str(ocr_data['text'][i]).strip()
+            if not text: continue
+            block_id = (ocr_data['block_num'][i], ocr_data['par_num'][i], ocr_data['line_num'][i]) # Line-level
+            x, y, w, h = ocr_data['left'][i], ocr_data['top'][i], ocr_data['width'][i], ocr_data['height'][i]
+            if block_id in block_coords:
+                curr_x1, curr_y1, curr_x2, curr_y2 = block_coords[block_id]
+                block_coords[block_id] = (min(curr_x1, x), min(curr_y1, y), max(curr_x2, x + w), max(curr_y2, y + h))
+            else: block_coords[block_id] = (x, y, x + w, y + h)
+    return block_coords
+
+def band_bounds(gray_image, band_height):
+    """Splits a page into horizontal bands of roughly `band_height` rows.
+
+    Each cut is placed at the row with the least ink within a quarter band
+    of the nominal boundary, so bands split between text lines, not through them.
+    """
+    height = gray_image.shape[0]
+    if band_height <= 0 or height <= band_height * 1.5: return [(0, height)]
+    ink_per_row = (gray_image < 128).sum(axis=1); search = band_height // 4
+    cuts = [0]; target = band_height
+    while target < height - band_height // 2:
+        low, high = max(cuts[-1] + 1, target - search), min(height - 1, target + search)
+        cuts.append(low + int(np.argmin(ink_per_row[low:high]))); target = cuts[-1] + band_height
+    cuts.append(height)
+    return list(zip(cuts[:-1], cuts[1:]))
+
+def band_data(ocr_data, top, core, block_offset=0):
+    """Keeps the lines of one overlapping band that belong to it and moves them into page coordinates.
+
+    `top` is the band's first page row and `core` the (y1, y2) page rows it
+    owns. A line is kept when the centre row of its box lies in the core, so
+    every line in an overlap is kept by exactly one band, whole. Only word
+    rows are returned, renumbered the way a single pass would number them:
+    blocks from block_offset + 1, paragraphs, lines and words from 1.
+    """
+    words = [i for i in range(len(ocr_data['text'])) if str(ocr_data['text'][i]).strip()]
+    line_rows = {}
+    for i in words: line_rows.setdefault((ocr_data['block_num'][i], ocr_data['par_num'][i], ocr_data['line_num'][i]), []).append(i)
+    kept = []
+    for rows in line_rows.values():
+        y1 = min(ocr_data['top'][i] for i in rows); y2 = max(ocr_data['top'][i] + ocr_data['height'][i] for i in rows)
+        if core[0] <= top + (y1 + y2) / 2 < core[1]: kept.extend(rows)
+    kept.sort(key=lambda i: (ocr_data['block_num'][i], ocr_data['par_num'][i], ocr_data['line_num'][i], ocr_data['word_num'][i]))
+    merged = {key: [values[i] for i in kept] for key, values in ocr_data.items()}
+    merged.update(top=[ocr_data['top'][i] + top for i in kept], level=[5] * len(kept),
+                  block_num=[], par_num=[], line_num=[], word_num=[])
+    blocks = {}; pars = {}; lines = {}; previous = None
+    for i in kept:
+        block, par, line = ocr_data['block_num'][i], ocr_data['par_num'][i], ocr_data['line_num'][i]
+        if block not in blocks: blocks[block] = block_offset + len(blocks) + 1
+        if (block, par) not in pars: pars[block, par] = sum(1 for key in pars if key[0] == block) + 1
+        if (block, par, line) not in lines: lines[block, par, line] = sum(1 for key in lines if key[:2] == (block, par)) + 1
+        word = merged['word_num'][-1] + 1 if previous == (block, par, line) else 1; previous = (block, par, line)
+        merged['block_num'].append(blocks[block]); merged['par_num'].append(pars[block, par])
+        merged['line_num'].append(lines[block, par, line]); merged['word_num'].append(word)
+    return merged
+
+def iter_ocr_data_bands(gray_image, band_height=0, overlap=0, workers=1, config=DEFAULTS["page_config"], cache=None, digest=None,
+                        stage="page_pass", page=None):
+    """Runs image_to_data band by band, yielding (band_index, band_count, ocr_data) in page order.
+
+    Bands are cut as in band_bounds and each is OCRed with `overlap` extra
+    rows above and below, so a line crossing a cut is read whole by one of
+    its two bands; band_data keeps each line once. With workers > 1 the
+    bands are OCRed in parallel on threads (every band is its own Tesseract
+    process). A page that fits in one band is a single, unchanged pass.
+    Each band's Tesseract call is recorded as one `stage` record for `page`.
+    """
+    bounds = band_bounds(gray_image, band_height); height, width = gray_image.shape[:2]
+    tiles = [(max(0, y1 - overlap), min(height, y2 + overlap)) for y1, y2 in bounds]
+
+    def ocr_band(tile): #_
+        top, bottom = tile; band = gray_image[top:bottom]
+        box = (0, top, width, bottom) if len(tiles) > 1 else None # A single band keys the cache like the whole page
+        with profiling.stage(stage, page):
+            if cache: return cache.image_to_data(band, config=config, box=box, digest=digest)
+            return pytesseract.image_to_data(band, config=config, output_type=Output.DICT)
+
+    if len(tiles) == 1: yield 0, 1, ocr_band(tiles[0]); return
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        block_offset = 0
+        # map() hands bands back in page order, so block numbers stay stable while results stream in
+        for band_index, (core, (top, _bottom), ocr_data) in enumerate(zip(bounds, tiles, executor.map(ocr_band, tiles))):
+            ocr_data = band_data(ocr_data, top, core, block_offset)
+            block_offset = max(ocr_data['block_num'], default=block_offset)
+            yield band_index, len(tiles), ocr_data
+
+def iter_text_block_bands(gray_image, band_height=DEFAULTS["page_band_height"], conf_threshold=DEFAULTS["ocr_confidence_threshold"], cache=None, digest=None,
+                          overlap=DEFAULTS["page_band_overlap"], workers=1):
+    """Runs the --psm 1 pass band by band, yielding (band_index, band_count, block_coords, ocr_data).
+
+    Coordinates are page coordinates and block numbers continue across
+    bands, so block ids stay unique and stable while results stream in.
+    """
+    for band_index, band_count, ocr_data in iter_ocr_data_bands(gray_image, band_height, overlap, workers, DEFAULTS["page_config"], cache, digest):
+        yield band_index, band_count, blocks_from_ocr_data(ocr_data, conf_threshold), ocr_data
+
+def concat_ocr_data(ocr_datas):
+    merged = {}
+    for ocr_data in ocr_datas:
+        for key, values in ocr_data.items(): merged.setdefault(key, []).extend(values)
+    return merged
+
+def ocr_data_text(ocr_data):
+    """Plain text from image_to_data word rows, laid out like Tesseract's text output.
+
+    Words of a line are joined by spaces, each paragraph is followed by a
+    blank line, and the page ends with "\f".
+    """
+    rows = sorted((i for i in range(len(ocr_data['text'])) if str(ocr_data['text'][i]).strip()),
+                  key=lambda i: (ocr_data['block_num'][i], ocr_data['par_num'][i], ocr_data['line_num'][i], ocr_data['word_num'][i]))
+    paragraphs = {}
+    for i in rows:
+        lines = paragraphs.setdefault((ocr_data['block_num'][i], ocr_data['par_num'][i]), {})
+        lines.setdefault(ocr_data['line_num'][i], []).append(str(ocr_data['text'][i]).strip())
+    return "".join("\n".join(" ".join(words) for words in lines.values()) + "\n\n" for lines in paragraphs.values()) + "\f"
+
+def detect_text_blocks(gray_image, conf_threshold=DEFAULTS["ocr_confidence_threshold"], cache=None, digest=None,
+                       band_height=DEFAULTS["page_band_height"], overlap=DEFAULTS["page_band_overlap"], workers=1):
+    """Runs the page-level --psm 1 pass and returns (block_coords, WordTable).
+
+    The default bands are the GUI's, so block ids and cache entries are the
+    same in every tool; band_height=0 runs the page as one piece. Tesseract
+    errors propagate to the caller.
+    """
+    block_coords = {}; ocr_datas = []
+    for _band_index, _band_count, band_blocks, ocr_data in iter_text_block_bands(gray_image, band_height, conf_threshold, cache, digest, overlap, workers):
+        block_coords.update(band_blocks); ocr_datas.append(ocr_data)
+    return block_coords, WordTable(concat_ocr_data(ocr_datas), conf_threshold)
+
+def padded_crop_box(gray_image, coords, pad=DEFAULTS["block_padding"]):
+    x1, y1, x2, y2 = coords
+    return (max(0, x1 - pad), max(0, y1 - pad), min(gray_image.shape[1], x2 + pad), min(gray_image.shape[0], y2 + pad))
+
+def ocr_region(gray_image, coords, pad=DEFAULTS["block_padding"], cache=None, digest=None):
+    """OCRs one region of the page with --psm 6. Returns None for an empty crop."""
+    crop_box = padded_crop_box(gray_image, coords, pad)
+    cropped_reg = gray_image[crop_box[1]:crop_box[3], crop_box[0]:crop_box[2]]
+    if cropped_reg.size == 0: return None
+    if cache: return cache.image_to_string(Image.fromarray(cropped_reg), config=DEFAULTS["region_config"], box=crop_box, digest=digest)
+    return pytesseract.image_to_string(Image.fromarray(cropped_reg), config=DEFAULTS["region_config"])
+
+_tesserocr_local = threading.local()
+
+def _tesserocr_api(psm):
+    # One API handle per thread and page-segmentation mode; the language model loads once
+    apis = _tesserocr_local.__dict__.setdefault("apis", {})
+    if psm not in apis: apis[psm] = tesserocr.PyTessBaseAPI(psm=psm)
+    return apis[psm]
+
+def _psm_only(config):
+    # tesserocr is only used for plain "--psm N" configs; anything else goes to the CLI
+    args = shlex.split(config)
+    if len(args) == 2 and args[0] == "--psm" and args[1].isdigit(): return int(args[1])
+    return None
+
+def batch_engine(config=DEFAULTS["region_config"]):
+    """Names the engine tesseract_many uses for `config`: a tesserocr version, or None for the tesseract CLI.
+
+    Its output differs slightly from the CLI's (whitespace, no trailing "\f"), so cache keys include it.
+    """
+    if tesserocr is not None and _psm_only(config) is not None: return f"tesserocr {tesserocr.tesseract_version()}"
+    return None
+
+def tesseract_many(images, config=DEFAULTS["region_config"]):
+    """OCRs a list of images in one Tesseract session and returns their texts in order.
+
+    Uses a persistent tesserocr handle when available, otherwise a single
+    tesseract run over a list file. Falls back to one call per image if the
+    page separators in the combined output cannot be matched up.
+    """
+    if not images: return []
+    psm = _psm_only(config)
+    if tesserocr is not None and psm is not None:
+        api = _tesserocr_api(psm); texts = []
+        with profiling.stage("tesseract", count=len(images)):
+            for image in images:
+                api.SetImage(Image.fromarray(image)); texts.append(api.GetUTF8Text())
+        return texts
+    with tempfile.TemporaryDirectory(prefix="ocr_batch_") as tmp_dir:
+        list_path = os.path.join(tmp_dir, "images.txt")
+        with profiling.stage("png_encode", count=len(images)), open(list_path, "w", encoding="utf-8") as list_file:
+            for i, image in enumerate(images):
+                image_path = os.path.join(tmp_dir, f"region_{i:04d}.png")
+                Image.fromarray(image).save(image_path, compress_level=1)
+                list_file.write(image_path + "\n")
+        out_base = os.path.join(tmp_dir, "out")
+        with profiling.stage("tesseract", count=len(images)):
+            proc = subprocess.run([pytesseract.pytesseract.tesseract_cmd, list_path, out_base, *shlex.split(config)], capture_output=True)
+        if proc.returncode != 0: raise pytesseract.TesseractError(proc.returncode, proc.stderr.decode("utf-8", "replace"))
+        with open(out_base + ".txt", "r", encoding="utf-8") as f: pages = f.read().split("\f")
+    # Tesseract versions differ on whether the form feed follows every page or only separates them
+    if len(pages) == len(images) + 1 and not pages[-1].strip(): pages = pages[:-1]
+    if len(pages) == len(images): return pages
+    print(f"Warning: batched OCR returned {len(pages)} pages for {len(images)} regions; OCRing them one by one.")
+    return [pytesseract.image_to_string(Image.fromarray(image), config=config) for image in images]
+
+def ocr_regions_batch(gray_image, regions, pad=DEFAULTS["block_padding"], cache=None, digest=None, known_texts=None):
+    """OCRs [(source_id, coords), ...] of one page together.
+
+    Returns {source_id: text}, with None for empty crops. Texts already in
+    `known_texts` (e.g. from WordTable.texts_for) and cached regions are
+    reused; only the rest go to Tesseract, in one batch.
+    """
+    config = DEFAULTS["region_config"]; engine = batch_engine(config); results = {}; pending = []
+    for source_id, coords in regions:
+        if known_texts and source_id in known_texts: results[source_id] = known_texts[source_id]; continue
+        crop_box = padded_crop_box(gray_image, coords, pad)
+        cropped_reg = gray_image[crop_box[1]:crop_box[3], crop_box[0]:crop_box[2]]
+        if cropped_reg.size == 0: results[source_id] = None; continue
+        key = cache.key(digest, crop_box, config, "string", engine) if cache else None
+        cached = cache.get(key) if cache else None
+        if cached is not None: results[source_id] = cached
+        else: pending.append((source_id, key, cropped_reg))
+    if profiling.enabled():
+        profiling.add("regions_reused", count=sum(1 for text in results.values() if text is not None)); profiling.add("regions_ocred", count=len(pending))
+    texts = tesseract_many([cropped_reg for _source_id, _key, cropped_reg in pending], config)
+    for (source_id, key, _cropped_reg), text in zip(pending, texts):
+        results[source_id] = text
+        if cache: cache.put(key, text)
+    return results
+
+def collect_regions(selected_block_ids, block_coords, user_rects, next_user_rect_id=0):
+    """Returns (regions, source_ids, next_user_rect_id) for the selected blocks and drawn rectangles."""
+    regions = []; source_ids = []
+    for block_id in selected_block_ids:
+        if block_id in block_coords:
+            regions.append(block_coords[block_id])
+            source_ids.append(block_source_id(block_id))
+    for rect_coords in user_rects:
+        regions.append(tuple(rect_coords))
+        next_user_rect_id += 1
+        source_ids.append(f"custom_{next_user_rect_id}")
+    return regions, source_ids, next_user_rect_id
+
+def process_region_text(raw_text, corrections):
+    with profiling.stage("corrections"): corrected = apply_global_corrections(raw_text, corrections)
+    with profiling.stage("reflow"): return clean_and_reflow_text(corrected)
+
+def regions_in_reading_order(regions, source_ids):
+    """Returns [(source_id, coords), ...] sorted top-to-bottom, then left-to-right."""
+    return [(source_id, coords) for _sort_key, coords, source_id in sorted(((coords[1], coords[0]), coords, source_ids[i]) for i, coords in enumerate(regions))]
+
+def format_combined_text(ordered_regions, raw_texts, corrections):
+    """Builds the "Edit Combined Text" document from already-OCRed regions, each with a header."""
+    combined_text_list = []
+    for idx, (source_id, _coords) in enumerate(ordered_regions):
+        raw_txt = raw_texts.get(source_id)
+        if raw_txt is None: continue
+        cleaned_txt = process_region_text(raw_txt, corrections)
+        combined_text_list.append(f"--- Region {idx+1} ({source_id}) ---\n{cleaned_txt}")
+    return "\n\n".join(combined_text_list)
+
+def combine_regions(gray_image, regions, source_ids, corrections, pad=DEFAULTS["block_padding"], cache=None, digest=None, known_texts=None):
+    """OCRs the regions and builds the "Edit Combined Text" document in reading order."""
+    ordered_regions = regions_in_reading_order(regions, source_ids)
+    raw_texts = ocr_regions_batch(gray_image, ordered_regions, pad, cache, digest, known_texts)
+    return format_combined_text(ordered_regions, raw_texts, corrections)
+
+def combined_output_path(output_dir, image_path):
+    base_name = os.path.splitext(os.path.basename(image_path))[0]
+    return os.path.join(output_dir, f"{base_name}_combined_ocr.txt")
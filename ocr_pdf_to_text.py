@@ -1,35 +1,249 @@
 import fitz  # PyMuPDF
 import pytesseract
-from PIL import Image
-import io
-import sys
+import argparse
+import json
+import multiprocessing
 import os
+import time
+import profiling
+from pdf_render import render_page, array_to_image
+from ocr_cache import OCRCache, DEFAULT_CACHE_DIR, image_digest, string_and_data
+from ocr_engine import reflow_file, band_bounds, iter_ocr_data_bands, concat_ocr_data, ocr_data_text
+from word_boxes import WordBoxWriter, pages_on_disk, sidecar_path
+from searchable_pdf import build_searchable_pdf
+from page_triage import triage_page
+from detect_and_crop_illustrations import detect_page, write_crops
 
-def ocr_pdf(input_pdf_path, output_text_path):
+DPI = 300
+SKIPPED_PAGE_TEXT = "\f" # What Tesseract returns for an empty page; keeps page breaks for --reflow
+
+_worker_doc = None
+_worker_cache = None
+_worker_words = False
+_worker_triage = False
+_worker_tiles = None
+_worker_crops_dir = None
+
+def _init_worker(input_pdf_path, cache_dir, words, triage, profile, tiles, crops_dir):
+    # Each worker process keeps its own document handle; fitz documents
+    # cannot be shared across processes.
+    global _worker_doc, _worker_cache, _worker_words, _worker_triage, _worker_tiles, _worker_crops_dir
+    _worker_doc = fitz.open(input_pdf_path)
+    _worker_cache = OCRCache(cache_dir) if cache_dir else None
+    _worker_words = words
+    _worker_triage = triage
+    _worker_tiles = tiles
+    _worker_crops_dir = crops_dir
+    profiling.enable(profile)
+
+def ocr_tiled(gray, page_index, cache, tiles):
+    """OCRs a tall page as overlapping bands in parallel; returns (text, merged image_to_data dict).
+
+    `tiles` is (band height, overlap, threads) in rendered pixels; see
+    ocr_engine.iter_ocr_data_bands. The text is rebuilt from the word rows
+    (ocr_data_text), so its spacing, line breaks and block order can differ
+    from Tesseract's own text output for an untiled page.
+    """
+    band_height, overlap, threads = tiles
+    digest = image_digest(gray) if cache else None
+    # Every band is its own "tesseract" record; a page-level stage around them would count the seconds twice
+    data = concat_ocr_data(ocr_data for _band_index, _band_count, ocr_data in
+                           iter_ocr_data_bands(gray, band_height, overlap, threads, "", cache, digest, "tesseract", page_index))
+    return ocr_data_text(data), data
+
+def _tiled(gray, tiles):
+    # Pages that fit in one band take the ordinary single pass
+    return tiles and len(band_bounds(gray, tiles[0])) > 1
+
+def ocr_page(doc, page_index, cache=None, dpi=DPI, tiles=None):
+    with profiling.stage("render", page_index):
+        page = doc.load_page(page_index)
+        # Tesseract only looks at luminance, so render grayscale directly
+        pix, gray = render_page(page, dpi=dpi, gray=True)
+        image = array_to_image(gray)
+    if _tiled(gray, tiles): return ocr_tiled(gray, page_index, cache, tiles)[0]
+    # Includes pytesseract's temporary image file and the cache lookup
+    with profiling.stage("tesseract", page_index):
+        if cache: return cache.image_to_string(image, digest=image_digest(gray))
+        return pytesseract.image_to_string(image)
+
+def ocr_page_words(doc, page_index, cache=None, dpi=DPI, tiles=None):
+    """Returns (text, image_to_data dict, (width, height) in pixels) from one Tesseract run."""
+    with profiling.stage("render", page_index):
+        page = doc.load_page(page_index)
+        pix, gray = render_page(page, dpi=dpi, gray=True)
+        image = array_to_image(gray)
+    if _tiled(gray, tiles): text, data = ocr_tiled(gray, page_index, cache, tiles)
+    else:
+        with profiling.stage("tesseract", page_index):
+            if cache: text, data = cache.image_to_string_and_data(image, digest=image_digest(gray))
+            else: text, data = string_and_data(image)
+    return text, data, (gray.shape[1], gray.shape[0])
+
+def _ocr_page_counted(doc, page_index, cache, words=False, triage=False, tiles=None, crops_dir=None):
+    # Returns the text, the page's word data (or None), the triage decision
+    # (or None), and this call's cache hit/miss counts, so results from worker
+    # processes can be summed in the parent.
+    decision = None
+    if triage:
+        with profiling.stage("triage", page_index): decision = triage_page(doc.load_page(page_index))
+    if decision and decision["kind"] == "illustration" and crops_dir:
+        # Illustration pages go to the illustration cropper; the crops are logged with the decision
+        _page_index, crops, _decision = detect_page(doc, page_index)
+        if crops: os.makedirs(crops_dir, exist_ok=True)
+        decision["crops"] = [filename for filename, ok in write_crops(crops, page_index, crops_dir) if ok]
+    if decision and decision["kind"] != "text": # Blank and illustration pages are not OCRed
+        rect = doc.load_page(page_index).rect
+        size = (round(rect.width * DPI / 72), round(rect.height * DPI / 72))
+        return SKIPPED_PAGE_TEXT, ({"text": []}, size) if words else None, decision, 0, 0
+    dpi = decision["dpi"] if decision else DPI
+    hits, misses = (cache.hits, cache.misses) if cache else (0, 0)
+    if words: text, data, size = ocr_page_words(doc, page_index, cache, dpi, tiles); page_words = (data, size)
+    else: text = ocr_page(doc, page_index, cache, dpi, tiles); page_words = None
+    if not cache: return text, page_words, decision, 0, 0
+    return text, page_words, decision, cache.hits - hits, cache.misses - misses
+
+def _ocr_page_in_worker(page_index):
+    # The page's profiling records travel back with its result
+    return _ocr_page_counted(_worker_doc, page_index, _worker_cache, _worker_words, _worker_triage, _worker_tiles, _worker_crops_dir), profiling.take()
+
+def _iter_page_texts(doc, input_pdf_path, page_indices, workers, cache, words=False, triage=False, tiles=None, crops_dir=None):
+    if workers > 1:
+        cache_dir = cache.cache_dir if cache else None
+        initargs = (input_pdf_path, cache_dir, words, triage, profiling.enabled(), tiles, crops_dir)
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+            # imap yields results in page order even though pages finish out of order
+            for i, (result, records) in zip(page_indices, pool.imap(_ocr_page_in_worker, page_indices)):
+                profiling.extend(records)
+                yield i, result
+    else:
+        for i in page_indices:
+            yield i, _ocr_page_counted(doc, i, cache, words, triage, tiles, crops_dir)
+
+def _checkpoint_header(input_pdf_path, page_count):
+    stat = os.stat(input_pdf_path)
+    return {"pdf": os.path.abspath(input_pdf_path), "pages": page_count, "size": stat.st_size, "mtime": stat.st_mtime}
+
+def read_checkpoint(checkpoint_path, header, max_pages=None):
+    """Returns (pages_done, output_offset) recorded in a checkpoint, or (0, 0).
+
+    With `max_pages`, stops at that many pages even if more were recorded.
+    """
+    if not os.path.exists(checkpoint_path):
+        return 0, 0
+    pages_done, offset = 0, 0
+    with open(checkpoint_path, "r", encoding="utf-8") as f:
+        try:
+            if json.loads(f.readline()) != header:
+                print(f"Checkpoint '{checkpoint_path}' belongs to a different PDF; starting over.")
+                return 0, 0
+            for line in f:
+                entry = json.loads(line)
+                if entry["page"] != pages_done or pages_done == max_pages: break
+                pages_done, offset = entry["page"] + 1, entry["offset"]
+        except (ValueError, KeyError):
+            pass  # a torn last line from an interrupted write
+    return pages_done, offset
+
+def ocr_pdf(input_pdf_path, output_text_path, workers=1, resume=False, cache=None, words_path=None, triage=False, tiles=None):
+    """OCRs every page to output_text_path.
+
+    With `triage`, each page is first classified from a thumbnail (see
+    page_triage.py): blank pages are skipped, illustration pages are cropped
+    into <output>_cropped_images/ by detect_and_crop_illustrations instead of
+    being OCRed (so their captions are not in the text), and text pages are
+    rendered at the dpi their type size calls for. Decisions are logged to <output>.triage.jsonl. With `tiles` (band height, overlap, threads),
+    pages taller than one and a half bands are OCRed as overlapping bands
+    in parallel, with approximate text layout (see ocr_tiled).
+    """
+    start_time = time.perf_counter()
     doc = fitz.open(input_pdf_path)
-    ocr_text = []
+    page_count = len(doc)
+    checkpoint_path = output_text_path + ".ckpt"
+    header = _checkpoint_header(input_pdf_path, page_count)
 
-    print(f"Processing {len(doc)} pages from '{input_pdf_path}'...")
+    pages_done, offset = 0, 0
+    if resume and os.path.exists(output_text_path):
+        # The word-box sidecar may hold fewer pages (e.g. --words added on resume); redo the rest
+        pages_done, offset = read_checkpoint(checkpoint_path, header, pages_on_disk(words_path) if words_path else None)
+        if os.path.getsize(output_text_path) < offset: pages_done, offset = 0, 0
 
-    for i in range(len(doc)):
-        print(f"OCR page {i+1}/{len(doc)}")
-        page = doc.load_page(i)
-        pix = page.get_pixmap(dpi=300)
-        img = Image.open(io.BytesIO(pix.tobytes("png")))
-        text = pytesseract.image_to_string(img)
-        ocr_text.append(text)
+    print(f"Processing {page_count} pages from '{input_pdf_path}'...")
+    if pages_done: print(f"Resuming after page {pages_done}/{page_count}")
+    if workers > 1: doc.close()
+    words = WordBoxWriter(words_path, DPI, keep_pages=pages_done) if words_path else None
 
-    with open(output_text_path, "w", encoding="utf-8") as f:
-        f.write("\n\n".join(ocr_text))
+    # Pages are appended as soon as they finish; the checkpoint records the
+    # byte offset after each page so --resume can drop a half-written page.
+    triage_log_path = os.path.splitext(output_text_path)[0] + ".triage.jsonl"
+    triage_log = open(triage_log_path, "a" if pages_done else "w", encoding="utf-8") if triage else None
+    crops_dir = os.path.splitext(output_text_path)[0] + "_cropped_images" if triage else None
+    kinds = {}
+    with open(output_text_path, "r+b" if pages_done else "wb") as out, \
+         open(checkpoint_path, "a" if pages_done else "w", encoding="utf-8") as ckpt:
+        if pages_done:
+            out.seek(offset); out.truncate()
+        else:
+            ckpt.write(json.dumps(header) + "\n"); ckpt.flush()
+        cache_hits = cache_misses = 0
+        for i, (text, page_words, decision, hits, misses) in _iter_page_texts(doc, input_pdf_path, range(pages_done, page_count), workers, cache, bool(words), triage, tiles, crops_dir):
+            if decision:
+                triage_log.write(json.dumps(dict(page=i + 1, **decision)) + "\n"); triage_log.flush()
+                kinds[decision["kind"]] = kinds.get(decision["kind"], 0) + 1
+            if decision and "crops" in decision: print(f"Cropped page {i+1}/{page_count} (illustration, {len(decision['crops'])} images)")
+            elif decision and decision["kind"] != "text": print(f"Skipped page {i+1}/{page_count} ({decision['kind']})")
+            else: print(f"OCR page {i+1}/{page_count}" + (f" at {decision['dpi']} dpi" if decision else "") + (" (cached)" if hits else ""))
+            cache_hits += hits; cache_misses += misses
+            if cache: profiling.add("cache_hits", page=i, count=hits); profiling.add("cache_misses", page=i, count=misses)
+            with profiling.stage("write", i):
+                chunk = (text if i == 0 else "\n\n" + text).encode("utf-8")
+                out.write(chunk); out.flush()
+                if words: words.add_page(i, *page_words)
+                offset += len(chunk)
+                ckpt.write(json.dumps({"page": i, "offset": offset}) + "\n"); ckpt.flush()
 
+    if triage_log:
+        triage_log.close()
+        print("Triage: " + ", ".join(f"{count} {kind}" for kind, count in sorted(kinds.items())) + f" pages (log: '{triage_log_path}')")
+    if words: words.close(); print(f"Word boxes saved to '{words_path}'")
+    os.remove(checkpoint_path)
+    if cache: print(f"OCR cache: {cache_hits} hits, {cache_misses} misses")
+    profiling.add("ocr_pdf", time.perf_counter() - start_time, count=page_count - pages_done)
     print(f"OCR completed. Output saved to '{output_text_path}'")
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python ocr_pdf_to_text.py <input.pdf> [output.txt]")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(usage="python ocr_pdf_to_text.py <input.pdf> [output.txt] [--workers N] [--resume] [--no-cache] [--triage] [--tile-height ROWS] [--reflow] [--words] [--pdf] [--profile timings.json]")
+    parser.add_argument("input_file")
+    parser.add_argument("output_file", nargs="?")
+    parser.add_argument("--workers", type=int, default=1, help="number of OCR worker processes (default: 1)")
+    parser.add_argument("--resume", action="store_true", help="skip pages recorded in the output's .ckpt checkpoint")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="OCR result cache directory")
+    parser.add_argument("--no-cache", action="store_true", help="always rerun Tesseract")
+    parser.add_argument("--reflow", action="store_true", help="also write a dehyphenated, reflowed copy (<output>_reflowed.txt)")
+    parser.add_argument("--triage", action="store_true", help="skip blank pages, crop illustration pages into <output>_cropped_images/ instead of OCRing them, and pick each text page's dpi from a thumbnail")
+    parser.add_argument("--tile-height", type=int, default=0, help="OCR pages taller than 1.5x this many rendered rows as overlapping bands in parallel (0: off); "
+                        "their text is rebuilt from word boxes, so layout can differ slightly from an untiled run")
+    parser.add_argument("--tile-overlap", type=int, default=150, help="rows each band reads beyond its own; should exceed the tallest text line")
+    parser.add_argument("--tile-threads", type=int, default=4, help="bands OCRed at once per page")
+    parser.add_argument("--words", action="store_true", help="also save Tesseract word boxes to a <output>.words sidecar")
+    parser.add_argument("--pdf", action="store_true", help="also write <input>_searchable.pdf with an invisible text layer (implies --words)")
+    parser.add_argument("--profile", metavar="PATH", help="record per-page stage timings to PATH (.json, or .csv for the raw records)")
+    args = parser.parse_args()
 
-    input_file = sys.argv[1]
-    output_file = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(input_file)[0] + "_ocr.txt"
+    input_file = args.input_file
+    output_file = args.output_file or os.path.splitext(input_file)[0] + "_ocr.txt"
 
-    ocr_pdf(input_file, output_file)
+    words_path = sidecar_path(output_file) if args.words or args.pdf else None
+    profiling.enable(bool(args.profile))
+    ocr_pdf(input_file, output_file, workers=max(1, args.workers), resume=args.resume,
+            cache=None if args.no_cache else OCRCache(args.cache_dir), words_path=words_path, triage=args.triage,
+            tiles=(args.tile_height, args.tile_overlap, max(1, args.tile_threads)) if args.tile_height > 0 else None)
+    if args.reflow:
+        # Tesseract ends every page with "\f", so words hyphenated across pages are joined too
+        reflowed_file = os.path.splitext(output_file)[0] + "_reflowed.txt"
+        with profiling.stage("reflow"): paragraphs = reflow_file(output_file, reflowed_file)
+        print(f"Reflowed {paragraphs} paragraphs to '{reflowed_file}'")
+    if args.pdf:
+        with profiling.stage("searchable_pdf"):
+            build_searchable_pdf(input_file, words_path, os.path.splitext(input_file)[0] + "_searchable.pdf")
+    if args.profile: profiling.report(args.profile)
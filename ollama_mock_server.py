@@ -0,0 +1,123 @@
+import argparse
+import json
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from grammar_backend import GRAMMAR_PROMPT, GrammarCorrector, OllamaClient, split_chunks
+
+# Stand-in for `ollama serve` for trying the grammar backend without a model:
+# answers /api/generate with a mechanical "correction" of the text after the
+# grammar prompt (spaces before punctuation removed, doubled spaces collapsed,
+# first letter capitalised), after an optional delay per request.
+#
+#   python ollama_mock_server.py --port 11435 --delay 0.5
+#   OLLAMA_HOST=localhost:11435 python tesseract_select_text_regions16.py page.png
+#
+# `--check` instead runs the grammar backend against a private instance and
+# exits non-zero if chunking, the cache or the streamed results misbehave.
+
+def mock_correct(text):
+    text = re.sub(r"\s+([,.;:!?])", r"\1", text)
+    text = re.sub(r"[ \t]{2,}", " ", text)
+    return text[:1].upper() + text[1:]
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive, like the real server
+    server_version = "ollama-mock"
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers(); self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/api/tags": self._send_json(200, {"models": [{"name": self.server.model}]})
+        else: self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/api/generate": self._send_json(404, {"error": "not found"}); return
+        try: request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        except ValueError: self._send_json(400, {"error": "invalid JSON"}); return
+        prompt = request.get("prompt", "")
+        text = prompt[len(GRAMMAR_PROMPT):] if prompt.startswith(GRAMMAR_PROMPT) else prompt
+        with self.server.lock: self.server.requests += 1
+        time.sleep(self.server.delay)
+        self._send_json(200, {"model": request.get("model"), "response": mock_correct(text), "done": True})
+
+    def log_message(self, format, *args):
+        if self.server.verbose: super().log_message(format, *args)
+
+def make_server(host="127.0.0.1", port=11435, delay=0.0, model="llama3", verbose=False):
+    """Returns a ThreadingHTTPServer; port 0 picks a free one (see server.server_address)."""
+    server = ThreadingHTTPServer((host, port), MockOllamaHandler)
+    server.daemon_threads = True
+    server.delay = delay; server.model = model; server.verbose = verbose
+    server.requests = 0; server.lock = threading.Lock()
+    return server
+
+def check_backend(delay=0.01):
+    """Drives GrammarCorrector against a mock server on a free port; returns a list of failures."""
+    server = make_server(port=0, delay=delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    failures = []
+    def expect(ok, message): #_
+        if not ok: failures.append(message)
+    try:
+        paragraphs = [f"paragraph {i} , with  a stray space before the comma ." + " filler words" * 30 for i in range(12)]
+        text = "--- Region 1 (Block 1) ---\n" + "\n\n".join(paragraphs[:7]) + "\n\n--- Region 2 (Custom) ---\n" + "\n\n".join(paragraphs[7:])
+        segments = split_chunks(text)
+        chunks = [segment for segment, needs_correction in segments if needs_correction]
+        expect("".join(segment for segment, _needs in segments) == text, "split_chunks does not join back to the input")
+        expect(len(chunks) > 2, f"expected several chunks, got {len(chunks)}")
+        expect(not any("--- Region" in chunk for chunk in chunks), "a region header was sent to the model")
+        expected = "".join(mock_correct(segment).strip() if needs_correction else segment for segment, needs_correction in segments)
+
+        corrector = GrammarCorrector(OllamaClient(f"http://127.0.0.1:{server.server_address[1]}"), workers=3)
+        expect(corrector.correct_text(text) == expected, "correct_text did not rejoin the corrected chunks in order")
+        expect(server.requests == len(chunks), f"{server.requests} requests for {len(chunks)} chunks")
+        requests = server.requests
+        expect(corrector.correct_text(text) == expected, "cached correct_text differs from the first run")
+        expect(corrector.correct_text(expected) == expected, "re-checking corrected text changed it")
+        expect(server.requests == requests, "unchanged paragraphs were sent again")
+        edited = text.replace("paragraph 3 ,", "paragraph three ,")
+        corrector.correct_text(edited)
+        expect(server.requests == requests + 1, f"editing one paragraph sent {server.requests - requests} chunks")
+
+        # Streamed results: every chunk reported once with its own correction, then on_done
+        fresh = [(index, chunk.replace("filler", "padding")) for index, chunk in enumerate(chunks)]
+        results = {}; done = threading.Event(); lock = threading.Lock()
+        def on_result(index, corrected, error): #_
+            with lock: results.setdefault(index, []).append((corrected, error))
+        corrector.correct_async(fresh, on_result, done.set)
+        expect(done.wait(30), "on_done was not called")
+        expect(sorted(results) == [index for index, _chunk in fresh] and all(len(reported) == 1 for reported in results.values()),
+               "correct_async did not report every chunk exactly once")
+        expect(all(results.get(index) == [(mock_correct(chunk).strip(), None)] for index, chunk in fresh), "correct_async reported a wrong correction")
+    finally:
+        server.shutdown(); server.server_close()
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(usage="python ollama_mock_server.py [--port 11435] [--delay SECONDS] [--check]")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds to wait before each response")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    parser.add_argument("--check", action="store_true", help="test the grammar backend against a private mock server and exit")
+    args = parser.parse_args()
+
+    if args.check:
+        failures = check_backend()
+        for failure in failures: print(f"FAILED: {failure}")
+        if failures: sys.exit(1)
+        print("✅ Done. Grammar backend chunking, cache and streamed results check out.")
+        sys.exit(0)
+
+    server = make_server(args.host, args.port, args.delay, verbose=args.verbose)
+    print(f"Mock Ollama server on http://{args.host}:{server.server_address[1]} (Ctrl+C to stop)")
+    try: server.serve_forever()
+    except KeyboardInterrupt: pass
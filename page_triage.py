@@ -0,0 +1,109 @@
+import fitz  # PyMuPDF
+import cv2
+import argparse
+import json
+import os
+import numpy as np
+from pdf_render import render_page
+
+# Quick per-page triage from a low-resolution thumbnail: blank pages are
+# skipped, illustration pages go to illustration cropping instead of OCR, and
+# text pages get the lowest render dpi that still gives Tesseract glyphs of a
+# comfortable size.
+
+THUMB_DPI = 100
+BLANK_INK = 0.002 # Pages with less than this fraction of dark pixels (and no figure) are blank
+TARGET_X_HEIGHT = 20 # Pixels at OCR resolution; Tesseract does well from here up to about 30
+MIN_DPI, MAX_DPI, DEFAULT_DPI = 200, 400, 300
+FIGURE_SIZE = 100 # Same minimum as detect_and_crop_illustrations.MIN_SIZE, in pixels at 300 dpi
+ILLUSTRATION_AREA = 0.25 # A figure covering this much of the page, with little text, makes an illustration page
+MAX_CAPTION_GLYPHS = 150
+PAPER_MARGIN = 0.05 # Fraction of each edge sampled for the paper tone
+
+def paper_tone(gray):
+    """The paper's gray level, from the page margins so that a plate filling most of the page does not shift it.
+
+    The page median is the floor, for scans whose margins are dark scanner edges.
+    """
+    rows = max(1, int(gray.shape[0] * PAPER_MARGIN)); cols = max(1, int(gray.shape[1] * PAPER_MARGIN))
+    margins = np.concatenate((gray[:rows].ravel(), gray[-rows:].ravel(), gray[:, :cols].ravel(), gray[:, -cols:].ravel()))
+    return max(int(np.median(margins)), int(np.median(gray)))
+
+def _ink_threshold(paper):
+    # Below the paper tone rather than a fixed level, so yellowed scans are not all ink;
+    # on white paper this is detect_and_crop_illustrations.THRESHOLD
+    return min(200, paper - 50)
+
+def estimate_x_height(heights):
+    """Estimates x-height from glyph component heights: the most common height, refined by its neighbours."""
+    if len(heights) < 20: return None
+    counts = np.bincount(heights)
+    mode = int(np.argmax(counts))
+    near = np.arange(max(mode - 1, 0), min(mode + 2, len(counts)))
+    return float((near * counts[near]).sum() / counts[near].sum())
+
+def ocr_dpi(x_height, thumb_dpi=THUMB_DPI):
+    """The dpi at which x-height reaches TARGET_X_HEIGHT pixels, clamped and rounded to 25."""
+    if not x_height: return DEFAULT_DPI
+    dpi = TARGET_X_HEIGHT * thumb_dpi / x_height
+    return int(min(MAX_DPI, max(MIN_DPI, round(dpi / 25) * 25)))
+
+def triage_gray(gray, thumb_dpi=THUMB_DPI):
+    """Classifies a grayscale thumbnail; returns the decision dict logged per page."""
+    paper = paper_tone(gray)
+    _, ink = cv2.threshold(gray, _ink_threshold(paper), 255, cv2.THRESH_BINARY_INV)
+    ink_fraction = cv2.countNonZero(ink) / ink.size
+    # Figures are found on the ink mask, where a mid-tone plate is one solid blob
+    _count, _labels, ink_stats, _centroids = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    figure_limit = FIGURE_SIZE * thumb_dpi / 300 * 0.75 # Margin for blobs that shrink when downsampled
+    figure_boxes = ink_stats[1:][(ink_stats[1:, cv2.CC_STAT_WIDTH] > figure_limit) & (ink_stats[1:, cv2.CC_STAT_HEIGHT] > figure_limit), :4]
+    # Glyphs are measured at half the paper tone: anti-aliased glyph edges would otherwise add a pixel
+    _, core = cv2.threshold(gray, paper // 2, 255, cv2.THRESH_BINARY_INV)
+    _count, _labels, stats, _centroids = cv2.connectedComponentsWithStats(core, connectivity=8)
+    lefts, tops, widths, heights = (stats[1:, k] for k in (cv2.CC_STAT_LEFT, cv2.CC_STAT_TOP, cv2.CC_STAT_WIDTH, cv2.CC_STAT_HEIGHT))
+    in_figure = np.zeros(len(widths), dtype=bool) # Texture inside a plate is not text
+    for x, y, w, h in figure_boxes: in_figure |= (lefts >= x) & (tops >= y) & (lefts + widths <= x + w) & (tops + heights <= y + h)
+    # Glyph-sized components: at least 2 px tall, at most about 1/3 inch, not long rules
+    glyphs = (heights >= 2) & (heights <= thumb_dpi / 3) & (widths <= heights * 8) & ~in_figure
+    figure_area = float((figure_boxes[:, 2].astype(np.int64) * figure_boxes[:, 3]).max(initial=0)) / core.size
+    glyph_count = int(np.count_nonzero(glyphs))
+
+    if ink_fraction < BLANK_INK and not len(figure_boxes): kind = "blank"
+    elif figure_area >= ILLUSTRATION_AREA and glyph_count <= MAX_CAPTION_GLYPHS: kind = "illustration"
+    else: kind = "text"
+    x_height = estimate_x_height(heights[glyphs]) if kind == "text" else None
+    return {"kind": kind, "ink": round(ink_fraction, 4), "glyphs": glyph_count, "figures": len(figure_boxes),
+            "x_height": round(x_height * 300 / thumb_dpi, 1) if x_height else None, # In pixels at 300 dpi
+            "dpi": ocr_dpi(x_height, thumb_dpi) if kind == "text" else None}
+
+def triage_page(page, thumb_dpi=THUMB_DPI):
+    pix, gray = render_page(page, dpi=thumb_dpi, gray=True)
+    return triage_gray(gray, thumb_dpi)
+
+def triage_pdf(pdf_path, log_path=None, thumb_dpi=THUMB_DPI):
+    """Triages every page; writes one JSON line per page to log_path if given. Returns the decisions."""
+    decisions = []
+    log = open(log_path, "w", encoding="utf-8") if log_path else None
+    try:
+        for page_index, page in enumerate(fitz.open(pdf_path)):
+            decision = dict(page=page_index + 1, **triage_page(page, thumb_dpi))
+            decisions.append(decision)
+            if log: log.write(json.dumps(decision) + "\n"); log.flush()
+    finally:
+        if log: log.close()
+    return decisions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(usage="python page_triage.py <input.pdf> [log.jsonl]")
+    parser.add_argument("input_file")
+    parser.add_argument("log_file", nargs="?")
+    parser.add_argument("--thumb-dpi", type=int, default=THUMB_DPI)
+    args = parser.parse_args()
+
+    log_file = args.log_file or os.path.splitext(args.input_file)[0] + "_triage.jsonl"
+    decisions = triage_pdf(args.input_file, log_file, args.thumb_dpi)
+    for decision in decisions:
+        detail = f", x-height {decision['x_height']} px at 300 dpi -> {decision['dpi']} dpi" if decision["kind"] == "text" else ""
+        print(f"Page {decision['page']}: {decision['kind']}{detail}")
+    kinds = [decision["kind"] for decision in decisions]
+    print(f"✅ Done. {kinds.count('text')} text, {kinds.count('illustration')} illustration, {kinds.count('blank')} blank pages. Log: {log_file}")
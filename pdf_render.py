@@ -0,0 +1,26 @@
+import fitz  # PyMuPDF
+import numpy as np
+from PIL import Image
+
+def pixmap_to_array(pix):
+    # Wraps the pixmap's sample buffer without copying it. The array is only
+    # valid while `pix` is alive, so callers must keep a reference to it.
+    samples = pix.samples_mv if hasattr(pix, "samples_mv") else pix.samples
+    buf = np.frombuffer(samples, dtype=np.uint8)
+    rows = buf.reshape(pix.height, pix.stride)[:, :pix.width * pix.n]
+    if pix.n == 1:
+        return rows
+    return rows.reshape(pix.height, pix.width, pix.n)
+
+def render_page(page, dpi=300, gray=False):
+    """Renders a page straight to a NumPy array (HxW for gray, HxWx3 for RGB).
+
+    Returns (pix, array); the array shares memory with pix.
+    """
+    colorspace = fitz.csGRAY if gray else fitz.csRGB
+    pix = page.get_pixmap(dpi=dpi, colorspace=colorspace, alpha=False)
+    return pix, pixmap_to_array(pix)
+
+def array_to_image(array):
+    # Image.fromarray shares the buffer for contiguous uint8 arrays.
+    return Image.fromarray(array)
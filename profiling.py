@@ -0,0 +1,97 @@
+import csv
+import json
+import threading
+import time
+from contextlib import nullcontext
+
+# Opt-in per-page, per-stage timers and counters for the OCR tools (their
+# --profile flag). Records are plain dicts {"page", "stage", "seconds", "count"}
+# so pool workers can hand theirs back to the parent with take()/extend().
+# While disabled, stage() returns one shared no-op context and nothing is recorded.
+
+FIELDS = ("page", "stage", "seconds", "count")
+
+_enabled = False
+_records = []
+_lock = threading.Lock()
+_NULL_STAGE = nullcontext()
+
+def enable(on=True):
+    global _enabled
+    _enabled = on
+
+def enabled():
+    return _enabled
+
+def add(stage, seconds=None, page=None, count=1):
+    """Records one timing (`seconds`) or, with seconds=None, a counter."""
+    if not _enabled: return
+    with _lock: _records.append({"page": page, "stage": stage, "seconds": seconds, "count": count})
+
+class _Timer:
+    __slots__ = ("stage", "page", "count", "start")
+
+    def __init__(self, stage, page, count):
+        self.stage = stage; self.page = page; self.count = count
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        add(self.stage, time.perf_counter() - self.start, self.page, self.count)
+        return False
+
+def stage(name, page=None, count=1):
+    """Times a with-block as one `name` record; `count` is how many items (regions, crops, ...) it handled."""
+    return _Timer(name, page, count) if _enabled else _NULL_STAGE
+
+def take():
+    """Returns and clears this process's records (pool workers send them to the parent)."""
+    global _records
+    with _lock: records, _records = _records, []
+    return records
+
+def extend(records):
+    if _enabled and records:
+        with _lock: _records.extend(records)
+
+def records():
+    with _lock: return list(_records)
+
+def summary(records_list=None):
+    """{stage: {"records", "count", "seconds", "pages"}} totals, stages in first-seen order."""
+    totals = {}
+    for record in records() if records_list is None else records_list:
+        total = totals.setdefault(record["stage"], {"records": 0, "count": 0, "seconds": None, "pages": set()})
+        total["records"] += 1; total["count"] += record["count"]
+        if record["seconds"] is not None: total["seconds"] = (total["seconds"] or 0.0) + record["seconds"]
+        if record["page"] is not None: total["pages"].add(record["page"])
+    for total in totals.values(): total["pages"] = len(total["pages"])
+    return totals
+
+def format_summary(records_list=None):
+    lines = [f"{'stage':>22} {'count':>8} {'seconds':>9} {'ms/item':>8} {'items/s':>8}"]
+    for name, total in summary(records_list).items():
+        seconds = total["seconds"]
+        if seconds is None: lines.append(f"{name:>22} {total['count']:>8}"); continue
+        per_item = seconds * 1000 / total["count"] if total["count"] else 0.0
+        rate = f"{total['count'] / seconds:>8.2f}" if seconds else f"{'-':>8}"
+        lines.append(f"{name:>22} {total['count']:>8} {seconds:>9.3f} {per_item:>8.1f} {rate}")
+    return "\n".join(lines)
+
+def save(path, records_list=None):
+    """Writes the records to `path`: CSV for a .csv name, otherwise JSON with a per-stage summary."""
+    records_list = records() if records_list is None else records_list
+    if path.lower().endswith(".csv"):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS); writer.writeheader(); writer.writerows(records_list)
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary(records_list), "records": records_list}, f, indent=1)
+    return path
+
+def report(path):
+    """Prints the per-stage summary and saves the records; what each CLI does at the end of a --profile run."""
+    print(format_summary())
+    print(f"Profile saved to '{save(path)}'")
@@ -0,0 +1,79 @@
+import fitz  # PyMuPDF
+import argparse
+import os
+import shutil
+import sys
+from word_boxes import WordBoxes, sidecar_path
+
+# Adds an invisible, searchable text layer to a scanned PDF from the word
+# boxes ocr_pdf_to_text.py --words recorded, without rendering or OCRing
+# anything again.
+
+FONT = fitz.Font("helv")
+
+def add_text_layer(page, boxes, texts, image_size):
+    """Writes the words as invisible text (render mode 3) over their boxes on the page."""
+    if not texts: return 0
+    width_px, height_px = image_size
+    # Word boxes are in pixels of the rendered, i.e. rotated, page: scale them
+    # to points, then map them into the unrotated space of the content stream.
+    sx, sy = page.rect.width / width_px, page.rect.height / height_px
+    rotation, derotate = page.rotation, page.derotation_matrix
+    # TextWriter ignores /Rotate, so write on an unrotated page and turn the
+    # whole layer with `morph`; points are pre-transformed to land in place.
+    morph = fitz.Matrix(rotation)
+    if rotation: page.set_rotation(0)
+    writer = fitz.TextWriter(page.rect)
+    written = 0
+    for (left, top, width, height), text in zip(boxes.tolist(), texts):
+        unit_length = FONT.text_length(text, fontsize=1)
+        if not unit_length or width <= 0 or height <= 0: continue
+        # Size each word so it spans its box; a selection then highlights the word on the scan
+        fontsize = min(width * sx / unit_length, height * sy * 1.5)
+        writer.append(fitz.Point(left * sx, (top + height) * sy) * derotate * morph, text, font=FONT, fontsize=fontsize)
+        written += 1
+    writer.write_text(page, render_mode=3, morph=(fitz.Point(0, 0), morph) if rotation else None)
+    if rotation: page.set_rotation(rotation)
+    return written
+
+def build_searchable_pdf(input_pdf_path, words_path, output_pdf_path, batch_pages=50):
+    """Writes output_pdf_path: the input PDF plus a text layer on every page in the sidecar.
+
+    The input is copied and then updated in place with incremental saves
+    every `batch_pages` pages, reopening the document after each, so memory
+    does not grow with the page count. A file MuPDF had to repair on open
+    (common for scanner output) cannot take incremental saves, so it is
+    written out in full once instead of copied.
+    """
+    words = WordBoxes(words_path)
+    doc = fitz.open(input_pdf_path)
+    if doc.can_save_incrementally(): doc.close(); shutil.copyfile(input_pdf_path, output_pdf_path)
+    else: doc.save(output_pdf_path); doc.close()
+    doc = fitz.open(output_pdf_path)
+    page_count = min(len(doc), len(words))
+    if len(words) < len(doc): print(f"Warning: word boxes cover {len(words)} of {len(doc)} pages.")
+    total = 0
+    for page_index in range(page_count):
+        boxes, _conf, _line, texts = words.page_words(page_index)
+        total += add_text_layer(doc[page_index], boxes, texts, words.page_size[page_index].tolist())
+        if (page_index + 1) % batch_pages == 0 and page_index + 1 < page_count:
+            doc.saveIncr(); doc.close(); doc = fitz.open(output_pdf_path)
+            print(f"Text layer: {page_index + 1}/{page_count} pages")
+    doc.saveIncr(); doc.close()
+    print(f"Searchable PDF with {total} words saved to '{output_pdf_path}'")
+    return total
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(usage="python searchable_pdf.py <input.pdf> [output.pdf] [--words <book>.words]")
+    parser.add_argument("input_file")
+    parser.add_argument("output_file", nargs="?")
+    parser.add_argument("--words", help="word-box sidecar from ocr_pdf_to_text.py --words (default: <input>_ocr.words)")
+    args = parser.parse_args()
+
+    words_path = args.words or sidecar_path(os.path.splitext(args.input_file)[0] + "_ocr.txt")
+    if not os.path.isdir(words_path):
+        print(f"No word-box sidecar at '{words_path}'. Run ocr_pdf_to_text.py --words first.")
+        sys.exit(1)
+    output_file = args.output_file or os.path.splitext(args.input_file)[0] + "_searchable.pdf"
+
+    build_searchable_pdf(args.input_file, words_path, output_file)
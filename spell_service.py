@@ -0,0 +1,97 @@
+import hashlib
+import os
+import pickle
+import threading
+import spellchecker
+from spellchecker import SpellChecker
+
+SNAPSHOT_FORMAT = 1
+
+class SpellService:
+    """One SpellChecker per process, with the base and user dictionaries merged once.
+
+    The merged word-frequency table is saved as a pickle snapshot, so later
+    startups skip both the base dictionary and the user dictionary parse.
+    Words appended to the user dictionary after that are read from the
+    snapshot's recorded file offset onward, never with a full reload.
+    """
+
+    def __init__(self, user_dict_file, snapshot_file=None):
+        self.user_dict_file = user_dict_file
+        self.snapshot_file = snapshot_file or os.path.splitext(user_dict_file)[0] + ".snapshot"
+        self._spell = None
+        self._user_dict_offset = 0
+        self._lock = threading.RLock()
+
+    def get(self):
+        """Returns the shared SpellChecker, picking up words appended since the last call."""
+        with self._lock:
+            if self._spell is None: self._load()
+            else: self._read_appended_words()
+            return self._spell
+
+    def preload(self):
+        threading.Thread(target=self.get, daemon=True).start()
+
+    def add_word(self, word):
+        with self._lock:
+            spell = self.get()
+            with open(self.user_dict_file, "a", encoding="utf-8") as f: f.write(word.lower() + "\n")
+            self._read_appended_words()
+            return spell
+
+    def _user_dict_prefix_hash(self, length):
+        h = hashlib.sha1()
+        with open(self.user_dict_file, "rb") as f: h.update(f.read(length))
+        return h.hexdigest()
+
+    def _load(self):
+        if not os.path.exists(self.user_dict_file): open(self.user_dict_file, "w").close()
+        snapshot = self._read_snapshot()
+        if snapshot:
+            self._spell = SpellChecker(language=None)
+            self._spell.word_frequency.load_json(snapshot["words"])
+            self._user_dict_offset = snapshot["user_dict_offset"]
+        else:
+            self._spell = SpellChecker()
+            self._user_dict_offset = 0
+        if self._read_appended_words() or not snapshot: self._write_snapshot()
+
+    def _read_snapshot(self):
+        try:
+            with open(self.snapshot_file, "rb") as f: snapshot = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError, ValueError):
+            return None
+        if snapshot.get("format") != SNAPSHOT_FORMAT or snapshot.get("spellchecker") != getattr(spellchecker, "__version__", None):
+            return None
+        # The snapshot only covers the user dictionary if that file was appended to, not rewritten
+        offset = snapshot.get("user_dict_offset", 0)
+        if os.path.getsize(self.user_dict_file) < offset or self._user_dict_prefix_hash(offset) != snapshot.get("user_dict_hash"):
+            return None
+        return snapshot
+
+    def _write_snapshot(self):
+        snapshot = {"format": SNAPSHOT_FORMAT, "spellchecker": getattr(spellchecker, "__version__", None),
+                    "user_dict_offset": self._user_dict_offset,
+                    "user_dict_hash": self._user_dict_prefix_hash(self._user_dict_offset),
+                    "words": dict(self._spell.word_frequency.dictionary)}
+        tmp_path = self.snapshot_file + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f: pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.snapshot_file)
+        except OSError as e:
+            print(f"Warning: could not write spellchecker snapshot '{self.snapshot_file}': {e}")
+
+    def _read_appended_words(self):
+        """Loads user-dictionary lines added past the known offset; returns how many."""
+        size = os.path.getsize(self.user_dict_file)
+        if size == self._user_dict_offset: return 0
+        if size < self._user_dict_offset: # Rewritten underneath us; start over
+            self._spell = SpellChecker(); self._user_dict_offset = 0
+        with open(self.user_dict_file, "rb") as f:
+            f.seek(self._user_dict_offset); data = f.read()
+        complete = data[:data.rfind(b"\n") + 1] # Leave a half-written last line for next time
+        words = [line.strip() for line in complete.decode("utf-8").splitlines() if line.strip()]
+        if words: self._spell.word_frequency.load_words(words)
+        self._user_dict_offset += len(complete)
+        return len(words)
@@ -1,191 +1,156 @@
 import cv2
 import pytesseract
-from pytesseract import Output
-from PIL import Image
 import numpy as np
+import argparse
 import sys
 import os
 import re
+import time
 import tkinter as tk
-from tkinter import scrolledtext, messagebox, Toplevel, filedialog
-from spellchecker import SpellChecker
-import subprocess
+from tkinter import scrolledtext, messagebox, Toplevel, filedialog, ttk
+from spell_service import SpellService
+from grammar_backend import GrammarCorrector, OllamaClient, split_chunks
 import threading
+from concurrent.futures import ThreadPoolExecutor
+from ocr_cache import OCRCache, DEFAULT_CACHE_DIR, image_digest
+import ocr_engine
+import profiling
+from ocr_engine import (parse_corrections, read_corrections_file,
+                        collect_regions, process_region_text, CORRECTIONS_HEADER,
+                        CorrectionsMatcher)
 
 # --- Globals ---
 CONFIG = {
     "image_path": None,
     "original_image": None,
     "gray_image": None,
+    "image_digest": None, # Pixel hash of gray_image, the OCR cache key base
     "tesseract_block_coords": {},
+    "tesseract_words": None, # ocr_engine.WordTable from the initial pass
     "selected_tesseract_block_ids": [],
     "user_drawn_rects": [],
     "next_user_rect_id_counter": 0,
     "main_tk_root": None,
     "opencv_window_name": "OCR Image - Interactive Regions",
     "user_dict_file": "user_dictionary.txt",
+    "spell_service": None, # Shared SpellChecker, loaded once per process
+    "grammar_model": "llama3", "grammar_workers": 3, # Ollama model and concurrent paragraph requests
+    "grammar_corrector": None, # Talks to `ollama serve` (OLLAMA_HOST); caches corrected paragraphs for the session
     "corrections_file": "corrections.txt", # For global find/replace
     "global_corrections_map": {}, # Loaded from corrections_file {'find': 'replace'}
+    "global_corrections_matcher": CorrectionsMatcher({}), # Compiled form of the map; rebuilt whenever the map changes
     "output_dir": "ocr_outputs",
     "ocr_confidence_threshold": 30,
     "block_padding": 3,
+    "region_ocr_workers": 4, "region_ocr_chunk_size": 8, # Region OCR pool size and regions per Tesseract batch
+    "region_ocr_job": None, # The running background region OCR job, if any
+    # Bands of the background page pass; the engine's defaults, so batch_select_regions.py finds the same block ids
+    "initial_ocr_band_height": ocr_engine.DEFAULTS["page_band_height"], "initial_ocr_band_overlap": ocr_engine.DEFAULTS["page_band_overlap"],
+    "initial_ocr_band_workers": 4, # Bands OCRed at once
     "tkinter_update_interval": 50,
     "current_interaction_mode": "tesseract_select",
     "is_drawing_new_custom_rect": False,
     "new_custom_rect_start_point": None,
+    "block_index": None, # BlockGridIndex over tesseract_block_coords
+    "overlay_version": 0, "overlay_base_version": -1, "overlay_base": None, "last_frame_key": None,
+    "display_pyramid": [], "display_size": None, "fit_scale": 1.0, "max_zoom": 4.0, # Zoom: wheel or +/-/0 keys; pan: right-drag
+    "view_scale": 1.0, "view_origin": (0.0, 0.0), "pan_start": None,
+    "ocr_cache_dir": DEFAULT_CACHE_DIR,
+    "ocr_cache": None,
+    "profile_path": None, # --profile: stage timings are saved here on exit
 }
 
-# --- UTILITIES / SPELL CHECK / TEXT CLEANUP (largely unchanged) ---
-def load_user_dictionary(spell, user_dict_file):
-    if os.path.exists(user_dict_file):
-        with open(user_dict_file, "r", encoding="utf-8") as f:
-            words = [line.strip() for line in f if line.strip()]
-            spell.word_frequency.load_words(words)
-    else: open(user_dict_file, "w").close()
-
-def add_to_user_dictionary(word, spell, text_area, user_dict_file):
+# --- UTILITIES / SPELL CHECK (text cleanup lives in ocr_engine) ---
+def add_to_user_dictionary(word, highlighter):
     word = word.strip()
     if word:
-        with open(user_dict_file, "a", encoding="utf-8") as f: f.write(word.lower() + "\n")
-        spell.word_frequency.load_words([word.lower()])
-        highlight_misspelled(text_area, spell)
-
-def highlight_misspelled(text_area, spell):
-    text_area.tag_remove("misspelled", "1.0", tk.END)
-    text_content = text_area.get("1.0", tk.END)
-    for match in re.finditer(r'\b([a-zA-Z]+)\b', text_content):
-        word = match.group(1);
-        if len(word) < 3: continue
-        if not spell.known([word.lower()]):
-            start_index = f"1.0 + {match.start()} chars"; end_index = f"1.0 + {match.end()} chars"
-            text_area.tag_add("misspelled", start_index, end_index)
-    text_area.tag_config("misspelled", background="yellow", foreground="red")
-
-def clean_and_reflow_text(raw_text):
-    lines = raw_text.splitlines(); dehyphenated = []; i = 0; num_lines = len(lines)
-    while i < num_lines:
-        current_line_content = lines[i]; rstripped_line = current_line_content.rstrip()
-        if rstripped_line.endswith('-') and (i + 1) < num_lines:
-            next_line_original = lines[i+1]
-            if next_line_original.strip():
-                next_line_lstripped = next_line_original.lstrip(); is_continuation_candidate = False
-                if next_line_lstripped:
-                    first_char_next = next_line_lstripped[0]; part_before_hyphen_on_current = rstripped_line[:-1]
-                    if first_char_next.islower(): is_continuation_candidate = True
-                    elif first_char_next.isdigit():
-                        if part_before_hyphen_on_current and part_before_hyphen_on_current.isalnum(): is_continuation_candidate = True
-                if is_continuation_candidate:
-                    part_before_hyphen = rstripped_line[:-1]
-                    if '-' in part_before_hyphen: dehyphenated.append(rstripped_line + next_line_lstripped)
-                    else: dehyphenated.append(part_before_hyphen + next_line_lstripped)
-                    i += 2; continue
-                else: dehyphenated.append(rstripped_line); i += 1; continue
-            else: dehyphenated.append(rstripped_line); i += 2; continue
-        dehyphenated.append(rstripped_line); i += 1
-    reflowed_paragraphs_content = []; current_paragraph_lines = []
-    for line_entry in dehyphenated:
-        processed_line_for_paragraph = line_entry.strip()
-        if not processed_line_for_paragraph:
-            if current_paragraph_lines: reflowed_paragraphs_content.append(" ".join(current_paragraph_lines)); current_paragraph_lines = []
-            if not reflowed_paragraphs_content or reflowed_paragraphs_content[-1]: reflowed_paragraphs_content.append("")
-        else: current_paragraph_lines.append(processed_line_for_paragraph)
-    if current_paragraph_lines: reflowed_paragraphs_content.append(" ".join(current_paragraph_lines))
-    final_text_pieces = []
-    for k, p_content_block in enumerate(reflowed_paragraphs_content):
-        if p_content_block: final_text_pieces.append(p_content_block)
-        elif k > 0 and reflowed_paragraphs_content[k-1]: final_text_pieces.append("")
-    start_idx = 0;
-    while start_idx < len(final_text_pieces) and not final_text_pieces[start_idx]: start_idx += 1
-    end_idx = len(final_text_pieces);
-    while end_idx > start_idx and not final_text_pieces[end_idx-1]: end_idx -=1
-    return "\n\n".join(final_text_pieces[start_idx:end_idx])
+        CONFIG["spell_service"].add_word(word)
+        highlighter.word_added(word)
+
+class SpellHighlighter:
+    """Incremental "misspelled" tagging for one editor's text widget.
+
+    Only lines touched by an edit are re-checked, verdicts are memoized per
+    distinct word, and tagging runs in small batches between Tk events.
+    """
+    WORD_RE = re.compile(r'\b([a-zA-Z]+)\b')
+    LINES_PER_BATCH = 200
+
+    def __init__(self, text_area, spell):
+        self.text_area = text_area; self.spell = spell
+        self.known_words = {} # lowercased word -> bool
+        self.pending_lines = set(); self.job = None; self.edit_start_line = None
+        text_area.tag_config("misspelled", background="yellow", foreground="red")
+        text_area.bind("<KeyPress>", self._on_key_press, add="+")
+        text_area.bind("<KeyRelease>", self._on_key_release, add="+")
+        for event_name in ("<<Paste>>", "<<Cut>>", "<<Undo>>", "<<Redo>>"):
+            text_area.bind(event_name, self._on_bulk_edit, add="+")
+
+    def is_known(self, word):
+        word = word.lower(); verdict = self.known_words.get(word)
+        if verdict is None: verdict = self.known_words[word] = bool(self.spell.known([word]))
+        return verdict
+
+    def _line_count(self): return int(self.text_area.index("end-1c").split(".")[0])
+    def _insert_line(self): return int(self.text_area.index(tk.INSERT).split(".")[0])
+
+    def highlight_all(self): self.mark_lines(1, self._line_count())
+
+    def mark_lines(self, first, last):
+        self.pending_lines.update(range(max(1, first), last + 1))
+        if self.job is None: self.job = self.text_area.after_idle(self._run_batch)
+
+    def _on_key_press(self, _event): self.edit_start_line = self._insert_line()
+    def _on_key_release(self, _event):
+        line = self._insert_line(); start = self.edit_start_line or line
+        self.mark_lines(min(start, line), max(start, line)); self.edit_start_line = None
+    def _on_bulk_edit(self, _event):
+        # Pasted or undone text can land anywhere; wait for the edit, then re-check around the cursor
+        start = self._insert_line()
+        self.text_area.after_idle(lambda: self.mark_lines(min(start, self._insert_line()) - 1, max(start, self._insert_line()) + 1))
+
+    def _run_batch(self):
+        self.job = None
+        if not self.text_area.winfo_exists(): return
+        line_count = self._line_count()
+        batch = sorted(self.pending_lines)[:self.LINES_PER_BATCH]; self.pending_lines.difference_update(batch)
+        for line_num in batch:
+            if line_num > line_count: continue
+            self.text_area.tag_remove("misspelled", f"{line_num}.0", f"{line_num}.end")
+            indices = []
+            for match in self.WORD_RE.finditer(self.text_area.get(f"{line_num}.0", f"{line_num}.end")):
+                if len(match.group(1)) < 3 or self.is_known(match.group(1)): continue
+                indices.extend((f"{line_num}.{match.start()}", f"{line_num}.{match.end()}"))
+            if indices: self.text_area.tag_add("misspelled", *indices)
+        if self.pending_lines: self.job = self.text_area.after(1, self._run_batch)
+
+    def word_added(self, word):
+        # Only the tags for that word can change; drop them without rescanning
+        word = word.lower(); self.known_words[word] = True
+        ranges = self.text_area.tag_ranges("misspelled")
+        for start, end in zip(ranges[0::2], ranges[1::2]):
+            if self.text_area.get(start, end).lower() == word: self.text_area.tag_remove("misspelled", start, end)
 
 # --- GLOBAL CORRECTIONS ---
 def load_global_corrections():
-    CONFIG["global_corrections_map"].clear()
-    if not os.path.exists(CONFIG["corrections_file"]):
-        try:
-            with open(CONFIG["corrections_file"], "w", encoding="utf-8") as f:
-                f.write("# Global Corrections: Use format 'find_string = replace_string'\n")
-                f.write("# Example: teh = the\n")
-                f.write("# Example: ist = 1st\n")
-            print(f"'{CONFIG['corrections_file']}' created with examples.")
-        except IOError as e:
-            print(f"Error creating '{CONFIG['corrections_file']}': {e}")
-            return
-
-    try:
-        with open(CONFIG["corrections_file"], "r", encoding="utf-8") as f:
-            for line_num, line in enumerate(f, 1):
-                line = line.strip()
-                if not line or line.startswith('#'):
-                    continue
-                if '=' in line:
-                    parts = line.split('=', 1)
-                    find_str = parts[0].strip()
-                    replace_str = parts[1].strip()
-                    if find_str: # Ensure find_str is not empty
-                        CONFIG["global_corrections_map"][find_str] = replace_str
-                    else:
-                        print(f"Warning: Empty find string in '{CONFIG['corrections_file']}' at line {line_num}: '{line}'")
-                else:
-                    print(f"Warning: Invalid format in '{CONFIG['corrections_file']}' at line {line_num} (missing '='): '{line}'")
-    except IOError as e:
-        print(f"Error reading '{CONFIG['corrections_file']}': {e}")
+    CONFIG["global_corrections_map"] = read_corrections_file(CONFIG["corrections_file"])
+    CONFIG["global_corrections_matcher"] = CorrectionsMatcher(CONFIG["global_corrections_map"])
     print(f"Loaded {len(CONFIG['global_corrections_map'])} global corrections.")
 
 def save_global_corrections_from_text(text_content, parent_window):
-    new_corrections_map = {}
-    lines = text_content.splitlines()
-    for line_num, line in enumerate(lines, 1):
-        line = line.strip()
-        if not line or line.startswith('#'):
-            continue
-        if '=' in line:
-            parts = line.split('=', 1)
-            find_str = parts[0].strip()
-            replace_str = parts[1].strip()
-            if find_str:
-                new_corrections_map[find_str] = replace_str
-            else: # Silently ignore empty find string from editor for saving
-                pass 
-    
+    new_corrections_map = parse_corrections(text_content.splitlines()) # Silently ignores malformed lines
     CONFIG["global_corrections_map"] = new_corrections_map
+    CONFIG["global_corrections_matcher"] = CorrectionsMatcher(new_corrections_map)
     try:
         with open(CONFIG["corrections_file"], "w", encoding="utf-8") as f:
             if not new_corrections_map: # Write header if map is empty
-                 f.write("# Global Corrections: Use format 'find_string = replace_string'\n")
+                 f.write(CORRECTIONS_HEADER)
             for find_s, replace_s in CONFIG["global_corrections_map"].items():
                 f.write(f"{find_s} = {replace_s}\n")
         messagebox.showinfo("Corrections Saved", f"{len(CONFIG['global_corrections_map'])} corrections saved to '{CONFIG['corrections_file']}' and applied.", parent=parent_window)
     except IOError as e:
         messagebox.showerror("Save Error", f"Could not save corrections to '{CONFIG['corrections_file']}': {e}", parent=parent_window)
 
-def apply_global_corrections(text, corrections_map):
-    if not corrections_map:
-        return text
-    modified_text = text
-    for find_str, replace_str in corrections_map.items():
-        # re.escape ensures any special regex characters in find_str are treated literally
-        escaped_find_str = re.escape(find_str)
-        
-        # Pattern: (?<!\w) means "not preceded by a word character (alphanumeric or underscore)"
-        #          (?!\w) means "not followed by a word character (alphanumeric or underscore)"
-        # This effectively creates "whole word/phrase" boundaries suitable for strings
-        # that might start/end with symbols or include spaces.
-        pattern = r'(?<!\w)' + escaped_find_str + r'(?!\w)'
-        
-        try:
-            modified_text = re.sub(pattern, replace_str, modified_text)
-        except re.error as e:
-            # This might happen if a find_str creates an invalid regex pattern even after escaping,
-            # though unlikely for typical text.
-            print(f"Regex error for rule ['{find_str}' = '{replace_str}']: {e}. Skipping this rule.")
-            # You could also log this to a file or a status bar in the UI
-            continue # Skip this problematic rule
-
-    return modified_text
-
 corrections_editor_text_widget = None # Global reference for the text widget
 
 def show_corrections_editor(parent_root):
@@ -225,18 +190,89 @@ def show_corrections_editor(parent_root):
     editor_window.protocol("WM_DELETE_WINDOW", editor_window.destroy)
 
 
-# --- OCR HANDLING & OpenCV Display (mouse_callback, draw_regions, update_opencv_window unchanged) ---
-current_mouse_pos_for_preview = (0,0)
+# --- OCR HANDLING & OpenCV Display ---
+class BlockGridIndex:
+    """Uniform-grid index over block rectangles, so a click only tests the blocks in its cell."""
+    def __init__(self, block_coords, cell_size=128):
+        self.block_coords = block_coords; self.cell_size = cell_size; self.cells = {}; self.order = {}
+        for block_id, rect in block_coords.items(): self.add(block_id, rect)
+
+    def add(self, block_id, rect): # `rect` must also be in block_coords
+        x1, y1, x2, y2 = rect; self.order.setdefault(block_id, len(self.order))
+        for cell_y in range(y1 // self.cell_size, y2 // self.cell_size + 1):
+            for cell_x in range(x1 // self.cell_size, x2 // self.cell_size + 1): self.cells.setdefault((cell_x, cell_y), []).append(block_id)
+
+    def hit(self, x, y):
+        hits = [block_id for block_id in self.cells.get((x // self.cell_size, y // self.cell_size), ())
+                if self.block_coords[block_id][0] <= x <= self.block_coords[block_id][2] and self.block_coords[block_id][1] <= y <= self.block_coords[block_id][3]]
+        return min(hits, key=self.order.get) if hits else None # Overlaps resolve to the first block, as the linear scan did
+
+def rebuild_block_index():
+    CONFIG["block_index"] = BlockGridIndex(CONFIG["tesseract_block_coords"]); invalidate_overlay()
+
+def invalidate_overlay(): CONFIG["overlay_version"] += 1 # Call after any change to blocks, selection or rectangles
+
+# The window shows a screen-sized view of the scan: a pyramid level warped to the current zoom/pan.
+# Mouse positions are mapped back to full resolution, so every stored rectangle stays in gray_image pixels.
+def setup_display(max_width, max_height):
+    img = CONFIG["original_image"]; img_h, img_w = img.shape[:2]
+    fit_scale = min(1.0, max_width / img_w, max_height / img_h)
+    CONFIG["display_size"] = (max(1, round(img_w * fit_scale)), max(1, round(img_h * fit_scale)))
+    CONFIG["fit_scale"] = fit_scale; levels = [img] # Level 0 is the original itself, not a copy
+    while 0.5 ** len(levels) >= fit_scale and min(levels[-1].shape[:2]) > 1: levels.append(cv2.pyrDown(levels[-1]))
+    CONFIG["display_pyramid"] = levels
+    set_view(fit_scale, (0.0, 0.0))
+
+def set_view(scale, origin):
+    img_h, img_w = CONFIG["original_image"].shape[:2]; disp_w, disp_h = CONFIG["display_size"]
+    scale = min(CONFIG["max_zoom"], max(CONFIG["fit_scale"], scale))
+    origin_x = min(max(0.0, origin[0]), max(0.0, img_w - disp_w / scale)); origin_y = min(max(0.0, origin[1]), max(0.0, img_h - disp_h / scale))
+    CONFIG["view_scale"] = scale; CONFIG["view_origin"] = (origin_x, origin_y); invalidate_overlay()
+
+def zoom_view(factor, anchor_display=None):
+    # Keep the full-resolution point under `anchor_display` (default: view centre) fixed on screen
+    disp_w, disp_h = CONFIG["display_size"]; anchor_x, anchor_y = anchor_display or (disp_w / 2, disp_h / 2)
+    full_x, full_y = display_to_full(anchor_x, anchor_y, round_result=False); new_scale = CONFIG["view_scale"] * factor
+    set_view(new_scale, (full_x - anchor_x / new_scale, full_y - anchor_y / new_scale))
+
+def display_to_full(x, y, round_result=True):
+    scale = CONFIG["view_scale"]; origin_x, origin_y = CONFIG["view_origin"]
+    full_x, full_y = origin_x + x / scale, origin_y + y / scale
+    if not round_result: return full_x, full_y
+    img_h, img_w = CONFIG["original_image"].shape[:2]
+    return min(img_w - 1, max(0, int(full_x))), min(img_h - 1, max(0, int(full_y)))
+
+def full_to_display(x, y):
+    scale = CONFIG["view_scale"]; origin_x, origin_y = CONFIG["view_origin"]
+    return int(round((x - origin_x) * scale)), int(round((y - origin_y) * scale))
+
+def render_view(): #_ Only display-sized buffers are produced, whatever the scan size
+    scale = CONFIG["view_scale"]; origin_x, origin_y = CONFIG["view_origin"]
+    level_index = min(len(CONFIG["display_pyramid"]) - 1, max(0, int(np.floor(np.log2(1.0 / scale))))) if scale < 1 else 0
+    level = CONFIG["display_pyramid"][level_index]
+    level_scale = level.shape[1] / CONFIG["original_image"].shape[1] # Level pixels per full-res pixel
+    factor = scale / level_scale
+    warp = np.float32([[factor, 0, -origin_x * scale], [0, factor, -origin_y * scale]])
+    interpolation = cv2.INTER_NEAREST if factor > 1 else cv2.INTER_LINEAR
+    return cv2.warpAffine(level, warp, CONFIG["display_size"], flags=interpolation, borderMode=cv2.BORDER_REPLICATE)
+
+current_mouse_pos_for_preview = (0,0) # Full-resolution coordinates
 def mouse_callback(event, x, y, flags, param): #_
-    global current_mouse_pos_for_preview; current_mouse_pos_for_preview = (x,y)
+    global current_mouse_pos_for_preview
+    if event == cv2.EVENT_MOUSEWHEEL: zoom_view(1.25 if cv2.getMouseWheelDelta(flags) > 0 else 0.8, (x, y)); return
+    if event == cv2.EVENT_RBUTTONDOWN: CONFIG["pan_start"] = (x, y, CONFIG["view_origin"]); return
+    if event == cv2.EVENT_RBUTTONUP: CONFIG["pan_start"] = None; return
+    if event == cv2.EVENT_MOUSEMOVE and CONFIG["pan_start"] and flags & cv2.EVENT_FLAG_RBUTTON: # Right-drag pans
+        start_x, start_y, (origin_x, origin_y) = CONFIG["pan_start"]; scale = CONFIG["view_scale"]
+        set_view(scale, (origin_x - (x - start_x) / scale, origin_y - (y - start_y) / scale)); return
+    x, y = display_to_full(x, y); current_mouse_pos_for_preview = (x,y)
     if CONFIG["current_interaction_mode"] == "tesseract_select":
         if event == cv2.EVENT_LBUTTONDOWN:
-            clicked_block_id = None
-            for block_id, (x1_t, y1_t, x2_t, y2_t) in CONFIG["tesseract_block_coords"].items():
-                if x1_t <= x <= x2_t and y1_t <= y <= y2_t: clicked_block_id = block_id; break
+            clicked_block_id = CONFIG["block_index"].hit(x, y) if CONFIG["block_index"] else None
             if clicked_block_id:
                 if clicked_block_id in CONFIG["selected_tesseract_block_ids"]: CONFIG["selected_tesseract_block_ids"].remove(clicked_block_id)
                 else: CONFIG["selected_tesseract_block_ids"].append(clicked_block_id)
+                invalidate_overlay()
     elif CONFIG["current_interaction_mode"] == "custom_draw":
         if event == cv2.EVENT_LBUTTONDOWN: CONFIG["is_drawing_new_custom_rect"] = True; CONFIG["new_custom_rect_start_point"] = (x, y)
         elif event == cv2.EVENT_LBUTTONUP:
@@ -244,79 +280,92 @@ def mouse_callback(event, x, y, flags, param): #_
                 CONFIG["is_drawing_new_custom_rect"] = False; x1_c, y1_c = CONFIG["new_custom_rect_start_point"]; x2_c, y2_c = x, y
                 final_x1, final_y1 = min(x1_c, x2_c), min(y1_c, y2_c); final_x2, final_y2 = max(x1_c, x2_c), max(y1_c, y2_c)
                 if final_x2 > final_x1 + 5 and final_y2 > final_y1 + 5: CONFIG["user_drawn_rects"].append((final_x1, final_y1, final_x2, final_y2))
-                CONFIG["new_custom_rect_start_point"] = None
+                CONFIG["new_custom_rect_start_point"] = None; invalidate_overlay()
+
+def draw_rect_full_res(display_img, rect, color, thickness):
+    cv2.rectangle(display_img, full_to_display(rect[0], rect[1]), full_to_display(rect[2], rect[3]), color, thickness)
+
+def draw_base_overlay(): #_ View plus block and custom rectangles; rebuilt only when invalidated
+    display_img = render_view(); selected = set(CONFIG["selected_tesseract_block_ids"])
+    scale = CONFIG["view_scale"]; origin_x, origin_y = CONFIG["view_origin"]; disp_w, disp_h = CONFIG["display_size"]
+    view_x2, view_y2 = origin_x + disp_w / scale, origin_y + disp_h / scale
+    for block_id, rect in CONFIG["tesseract_block_coords"].items(): # Tesseract Blocks
+        if rect[2] < origin_x or rect[0] > view_x2 or rect[3] < origin_y or rect[1] > view_y2: continue # Off screen
+        draw_rect_full_res(display_img, rect, (0, 255, 0) if block_id in selected else (0, 0, 200), 2)
+    for rect in CONFIG["user_drawn_rects"]: draw_rect_full_res(display_img, rect, (255, 0, 0), 2) # User-Defined Rectangles, Blue
+    return display_img
 
 def draw_regions_on_image(): #_
-    display_img = CONFIG["original_image"].copy()
-    for block_id, (x1, y1, x2, y2) in CONFIG["tesseract_block_coords"].items(): # Tesseract Blocks
-        color = (0, 255, 0) if block_id in CONFIG["selected_tesseract_block_ids"] else (0, 0, 200)
-        cv2.rectangle(display_img, (x1, y1), (x2, y2), color, 2)
-    for (x1_u, y1_u, x2_u, y2_u) in CONFIG["user_drawn_rects"]: # User-Defined Rectangles
-        cv2.rectangle(display_img, (x1_u, y1_u), (x2_u, y2_u), (255, 0, 0), 2) # Blue
-    if CONFIG["is_drawing_new_custom_rect"] and CONFIG["new_custom_rect_start_point"]: # Live preview
-        x1_p, y1_p = CONFIG["new_custom_rect_start_point"]; x2_p, y2_p = current_mouse_pos_for_preview
-        cv2.rectangle(display_img, (x1_p, y1_p), (x2_p, y2_p), (200, 200, 0), 1)
-    return display_img
+    if CONFIG["overlay_base_version"] != CONFIG["overlay_version"]:
+        CONFIG["overlay_base"] = draw_base_overlay(); CONFIG["overlay_base_version"] = CONFIG["overlay_version"]
+    if CONFIG["is_drawing_new_custom_rect"] and CONFIG["new_custom_rect_start_point"]: # Live preview on a copy
+        display_img = CONFIG["overlay_base"].copy()
+        draw_rect_full_res(display_img, CONFIG["new_custom_rect_start_point"] + current_mouse_pos_for_preview, (200, 200, 0), 1)
+        return display_img
+    return CONFIG["overlay_base"]
 
 def update_opencv_window(): #_
     if CONFIG["original_image"] is not None:
-        display_img = draw_regions_on_image(); cv2.imshow(CONFIG["opencv_window_name"], display_img); cv2.waitKey(1)
+        frame_key = (CONFIG["overlay_version"], current_mouse_pos_for_preview if CONFIG["is_drawing_new_custom_rect"] else None)
+        if frame_key != CONFIG["last_frame_key"]: # Skip imshow entirely when nothing changed
+            cv2.imshow(CONFIG["opencv_window_name"], draw_regions_on_image()); CONFIG["last_frame_key"] = frame_key
+        key = cv2.waitKey(1) & 0xFF
+        if key in (ord('+'), ord('=')): zoom_view(1.25)
+        elif key == ord('-'): zoom_view(0.8)
+        elif key == ord('0'): set_view(CONFIG["fit_scale"], (0.0, 0.0))
     if CONFIG["main_tk_root"] and CONFIG["main_tk_root"].winfo_exists(): CONFIG["main_tk_root"].after(CONFIG["tkinter_update_interval"], update_opencv_window)
 
-# --- OLLAMA GRAMMAR (unchanged) ---
-def run_ollama_grammar_check(text_to_check, parent_window_for_popup): #_
-    prompt = ("Correct the grammar and punctuation of the following historical text.\n"
-              "Do not paraphrase or simplify. Preserve technical phrases and original meaning:\n\n" + text_to_check)
-    try:
-        proc = subprocess.Popen(["ollama", "run", "llama3"], stdout=subprocess.PIPE, stdin=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding='utf-8')
-        stdout, stderr = proc.communicate(input=prompt, timeout=120)
-        if proc.returncode != 0: return f"[Ollama Error (code {proc.returncode}): {stderr.strip()}]"
-        return stdout.strip()
-    except FileNotFoundError: return "[Ollama Error: 'ollama' command not found. Is it installed and in PATH?]"
-    except subprocess.TimeoutExpired: return "[Ollama Error: Process timed out after 120 seconds.]"
-    except Exception as e: return f"[Ollama Error: {e}]"
-
-def show_working_popup(parent, message="Working..."): #_
-    popup = Toplevel(parent); popup.title(""); popup.geometry("250x100")
-    parent.update_idletasks(); parent_x, parent_y = parent.winfo_x(), parent.winfo_y()
-    parent_width, parent_height = parent.winfo_width(), parent.winfo_height()
-    popup_x = parent_x + (parent_width // 2) - (250 // 2); popup_y = parent_y + (parent_height // 2) - (100 // 2)
-    popup.geometry(f"+{popup_x}+{popup_y}"); popup.transient(parent); popup.grab_set()
-    tk.Label(popup, text=message, wraplength=230).pack(padx=10, pady=20, expand=True); popup.update(); return popup
-
 # --- UI: TEXT EDITORS & DIALOGS (show_text_editor, ask_edit_mode unchanged from previous full code) ---
 def show_text_editor(parent_root, text_content, output_file_path, title_prefix="Editor"): #_
     editor_window = Toplevel(parent_root); editor_window.title(f"{title_prefix} - {os.path.basename(output_file_path)}"); editor_window.geometry("700x500")
-    spell = SpellChecker(); load_user_dictionary(spell, CONFIG["user_dict_file"])
+    spell = CONFIG["spell_service"].get()
     text_frame = tk.Frame(editor_window); text_frame.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
     text_area = scrolledtext.ScrolledText(text_frame, width=80, height=25, wrap=tk.WORD, undo=True)
-    text_area.pack(fill=tk.BOTH, expand=True); text_area.insert(tk.END, text_content); highlight_misspelled(text_area, spell)
+    text_area.pack(fill=tk.BOTH, expand=True); text_area.insert(tk.END, text_content)
+    highlighter = SpellHighlighter(text_area, spell); highlighter.highlight_all()
     def perform_save_action(): #_
         try:
             with open(output_file_path, "w", encoding="utf-8") as f: f.write(text_area.get("1.0", tk.END).strip())
-            highlight_misspelled(text_area, spell)
             messagebox.showinfo("Saved", f"Text saved to\n{output_file_path}", parent=editor_window)
         except Exception as e: messagebox.showerror("Save Error", f"Could not save file:\n{e}", parent=editor_window)
-    def save_and_close_action(): perform_save_action(); editor_window.destroy()
+    grammar_job = {"executor": None}
+    def save_and_close_action(): #_
+        if grammar_job["executor"]: grammar_job["executor"].shutdown(wait=False, cancel_futures=True); grammar_job["executor"] = None
+        perform_save_action(); editor_window.destroy()
     ollama_button = None
     if title_prefix.startswith("Combined"): #_
+        def post_to_editor(callback): #_ Called from grammar worker threads
+            try: editor_window.after(0, callback)
+            except (tk.TclError, RuntimeError): pass # Editor already closed
         def grammar_check_action(): #_
-            working_popup = show_working_popup(editor_window, "Running Ollama grammar check...")
-            editor_window.update_idletasks()
-            def correct_in_thread(): #_
-                try:
-                    raw_text_content = text_area.get("1.0", tk.END)
-                    corrected_text = run_ollama_grammar_check(raw_text_content, editor_window)
-                    editor_window.after(0, lambda: apply_corrections(corrected_text))
-                except Exception as e_thread: editor_window.after(0, lambda: messagebox.showerror("Grammar Thread Error", str(e_thread), parent=editor_window))
-                finally: editor_window.after(0, working_popup.destroy)
-            def apply_corrections(corrected_text): #_
-                if corrected_text.startswith("[Ollama Error"): messagebox.showerror("Grammar Check Error", corrected_text, parent=editor_window)
-                else:
-                    current_scroll = text_area.yview(); text_area.delete("1.0", tk.END); text_area.insert(tk.END, corrected_text)
-                    text_area.yview_moveto(current_scroll[0]); highlight_misspelled(text_area, spell)
-                    messagebox.showinfo("Grammar Check", "Grammar check complete.", parent=editor_window)
-            threading.Thread(target=correct_in_thread, daemon=True).start()
+            if grammar_job["executor"]: return
+            # Each paragraph chunk is bracketed by marks, so corrections land in place while the user keeps editing
+            chunks = []; originals = {}; offset = 0; failures = []
+            for index, (segment, needs_correction) in enumerate(split_chunks(text_area.get("1.0", "end-1c"))):
+                if needs_correction:
+                    text_area.mark_set(f"grammar_{index}_start", f"1.0 + {offset} chars"); text_area.mark_gravity(f"grammar_{index}_start", tk.LEFT)
+                    text_area.mark_set(f"grammar_{index}_end", f"1.0 + {offset + len(segment)} chars")
+                    chunks.append((index, segment)); originals[index] = segment
+                offset += len(segment)
+            if not chunks: return
+            done = [0]
+            def apply_chunk(index, corrected, error): #_
+                if not editor_window.winfo_exists(): return
+                start_mark, end_mark = f"grammar_{index}_start", f"grammar_{index}_end"; done[0] += 1
+                if error is not None: failures.append(str(error))
+                elif corrected != originals[index] and text_area.get(start_mark, end_mark) == originals[index]: # Leave paragraphs edited meanwhile alone
+                    text_area.edit_separator(); text_area.delete(start_mark, end_mark); text_area.insert(start_mark, corrected); text_area.edit_separator()
+                    highlighter.mark_lines(int(text_area.index(start_mark).split(".")[0]), int(text_area.index(end_mark).split(".")[0]))
+                text_area.mark_unset(start_mark, end_mark)
+                ollama_button.config(text=f"Grammar: {done[0]}/{len(chunks)}")
+            def finish(): #_
+                if not editor_window.winfo_exists(): return
+                grammar_job["executor"] = None; ollama_button.config(text="Grammar (Ollama)", state=tk.NORMAL)
+                if failures: messagebox.showerror("Grammar Check Error", f"{len(failures)} of {len(chunks)} paragraphs were not corrected:\n{failures[0]}", parent=editor_window)
+                else: messagebox.showinfo("Grammar Check", "Grammar check complete.", parent=editor_window)
+            ollama_button.config(text=f"Grammar: 0/{len(chunks)}", state=tk.DISABLED)
+            grammar_job["executor"] = CONFIG["grammar_corrector"].correct_async(
+                chunks, lambda index, corrected, error: post_to_editor(lambda: apply_chunk(index, corrected, error)), lambda: post_to_editor(finish))
         ollama_button = tk.Button(editor_window, text="Grammar (Ollama)", command=grammar_check_action)
     def on_right_click_editor(event): #_
         try:
@@ -325,7 +374,7 @@ def show_text_editor(parent_root, text_content, output_file_path, title_prefix="
             if selected_word:
                 cleaned_for_dict = re.sub(r'[^a-zA-Z\'-]', '', selected_word)
                 if cleaned_for_dict and messagebox.askyesno("Dictionary", f"Add '{cleaned_for_dict}' to dictionary?", parent=editor_window):
-                    add_to_user_dictionary(cleaned_for_dict, spell, text_area, CONFIG["user_dict_file"])
+                    add_to_user_dictionary(cleaned_for_dict, highlighter)
         except tk.TclError: pass
         finally:
             if text_area.tag_ranges(tk.SEL): text_area.tag_remove(tk.SEL, "1.0", tk.END)
@@ -352,6 +401,9 @@ def ask_edit_mode(parent): #_
 # --- CONTROL PANEL COMMANDS & MAIN LOGIC ---
 mode_switch_button_tk = None
 status_label_tk = None
+ocr_status_label_tk = None
+region_ocr_progress_tk = None
+region_ocr_cancel_button_tk = None
 
 def cmd_switch_interaction_mode():
     global mode_switch_button_tk, status_label_tk
@@ -365,111 +417,183 @@ def cmd_switch_interaction_mode():
         if status_label_tk: status_label_tk.config(text="Mode: Select Tesseract Blocks")
 
 def cmd_process_selected_regions():
-    regions_to_process = []; region_sources = []
-    for block_id in CONFIG["selected_tesseract_block_ids"]:
-        if block_id in CONFIG["tesseract_block_coords"]:
-            regions_to_process.append(CONFIG["tesseract_block_coords"][block_id])
-            region_sources.append(f"tess_{block_id[0]}_{block_id[1]}_{block_id[2]}") # Include line_num if present
-    for rect_coords in CONFIG["user_drawn_rects"]:
-        regions_to_process.append(rect_coords)
-        CONFIG["next_user_rect_id_counter"] += 1
-        region_sources.append(f"custom_{CONFIG['next_user_rect_id_counter']}")
+    if CONFIG["region_ocr_job"]: messagebox.showinfo("OCR Running", "Region OCR is already running. Cancel it or wait for it to finish.", parent=CONFIG["main_tk_root"]); return
+    regions_to_process, region_sources, CONFIG["next_user_rect_id_counter"] = collect_regions(
+        CONFIG["selected_tesseract_block_ids"], CONFIG["tesseract_block_coords"], CONFIG["user_drawn_rects"], CONFIG["next_user_rect_id_counter"])
     if not regions_to_process: messagebox.showwarning("No Regions", "No Tesseract blocks selected and no custom regions drawn.", parent=CONFIG["main_tk_root"]); return
     edit_mode = ask_edit_mode(CONFIG["main_tk_root"]);
     if not edit_mode: return
     base_name = os.path.splitext(os.path.basename(CONFIG["image_path"]))[0]; os.makedirs(CONFIG["output_dir"], exist_ok=True)
+    # Selected Tesseract blocks are assembled from the initial pass; only custom rectangles are OCRed again
+    known_texts = CONFIG["tesseract_words"].texts_for(CONFIG["selected_tesseract_block_ids"]) if CONFIG["tesseract_words"] else {}
     if edit_mode == "combined":
-        combined_text_list = []; sortable_regions = []
-        for i, coords in enumerate(regions_to_process): sortable_regions.append( ( (coords[1], coords[0]), coords, region_sources[i] ) )
-        sortable_regions.sort()
-        for idx, (_sort_key, coords, source_id) in enumerate(sortable_regions):
-            x1, y1, x2, y2 = coords; pad = CONFIG["block_padding"]
-            cropped_reg = CONFIG["gray_image"][max(0,y1-pad):min(CONFIG["gray_image"].shape[0],y2+pad), max(0,x1-pad):min(CONFIG["gray_image"].shape[1],x2+pad)]
-            if cropped_reg.size == 0: continue
-            raw_txt = pytesseract.image_to_string(Image.fromarray(cropped_reg), config='--psm 6')
-            text_after_global_corrections = apply_global_corrections(raw_txt, CONFIG["global_corrections_map"]) # Apply corrections
-            cleaned_txt = clean_and_reflow_text(text_after_global_corrections)
-            combined_text_list.append(f"--- Region {idx+1} ({source_id}) ---\n{cleaned_txt}")
-        full_text = "\n\n".join(combined_text_list)
-        output_f = os.path.join(CONFIG["output_dir"], f"{base_name}_combined_ocr.txt")
-        show_text_editor(CONFIG["main_tk_root"], full_text, output_f, title_prefix="Combined Editor")
+        ordered_regions = ocr_engine.regions_in_reading_order(regions_to_process, region_sources)
+        def show_combined(raw_texts): #_
+            full_text = ocr_engine.format_combined_text(ordered_regions, raw_texts, CONFIG["global_corrections_matcher"])
+            output_f = ocr_engine.combined_output_path(CONFIG["output_dir"], CONFIG["image_path"])
+            show_text_editor(CONFIG["main_tk_root"], full_text, output_f, title_prefix="Combined Editor")
+        run_region_ocr_job(ordered_regions, known_texts, show_combined)
     elif edit_mode == "individual":
-        for idx, coords in enumerate(regions_to_process):
-            x1, y1, x2, y2 = coords; source_id = region_sources[idx]; pad = CONFIG["block_padding"]
-            cropped_reg = CONFIG["gray_image"][max(0,y1-pad):min(CONFIG["gray_image"].shape[0],y2+pad), max(0,x1-pad):min(CONFIG["gray_image"].shape[1],x2+pad)]
-            if cropped_reg.size == 0: continue
-            raw_txt = pytesseract.image_to_string(Image.fromarray(cropped_reg), config='--psm 6')
-            text_after_global_corrections = apply_global_corrections(raw_txt, CONFIG["global_corrections_map"]) # Apply corrections
-            cleaned_txt = clean_and_reflow_text(text_after_global_corrections)
-            output_f = os.path.join(CONFIG["output_dir"], f"{base_name}_region_{idx+1}_{source_id}.txt")
-            show_text_editor(CONFIG["main_tk_root"], cleaned_txt, output_f, title_prefix=f"Editor Region {idx+1} ({source_id})")
-
-def cmd_clear_tesseract_selections(): CONFIG["selected_tesseract_block_ids"].clear()
-def cmd_clear_custom_regions(): CONFIG["user_drawn_rects"].clear()
+        def show_individual(raw_texts): #_
+            for idx, coords in enumerate(regions_to_process):
+                source_id = region_sources[idx]
+                raw_txt = raw_texts.get(source_id)
+                if raw_txt is None: continue
+                cleaned_txt = process_region_text(raw_txt, CONFIG["global_corrections_matcher"]) # Apply corrections, then reflow
+                output_f = os.path.join(CONFIG["output_dir"], f"{base_name}_region_{idx+1}_{source_id}.txt")
+                show_text_editor(CONFIG["main_tk_root"], cleaned_txt, output_f, title_prefix=f"Editor Region {idx+1} ({source_id})")
+        run_region_ocr_job(list(zip(region_sources, regions_to_process)), known_texts, show_individual)
+
+# --- BACKGROUND REGION OCR ---
+def run_region_ocr_job(regions, known_texts, on_done):
+    """OCRs [(source_id, coords), ...] on a thread pool, in chunks so progress can be shown and cancelled.
+
+    `on_done(raw_texts)` is called on the Tk thread once every chunk is back.
+    """
+    pending = [region for region in regions if region[0] not in known_texts]
+    chunk_size = CONFIG["region_ocr_chunk_size"]
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+    if not chunks: on_done(dict(known_texts)); return
+    job = {"executor": ThreadPoolExecutor(max_workers=CONFIG["region_ocr_workers"]), "results": dict(known_texts),
+           "done": 0, "total": len(chunks), "on_done": on_done, "start_time": time.perf_counter()}
+    CONFIG["region_ocr_job"] = job; show_region_ocr_progress(job)
+    root = CONFIG["main_tk_root"]
+    for chunk in chunks:
+        future = job["executor"].submit(ocr_engine.ocr_regions_batch, CONFIG["gray_image"], chunk,
+                                        CONFIG["block_padding"], CONFIG["ocr_cache"], CONFIG["image_digest"])
+        future.add_done_callback(lambda f: root.after(0, lambda: region_ocr_chunk_finished(job, f)))
+
+def region_ocr_chunk_finished(job, future): #_ Tk thread
+    if job is not CONFIG["region_ocr_job"] or future.cancelled(): return # Cancelled; drop late results
+    if future.exception() is not None:
+        end_region_ocr_job(f"Region OCR failed: {future.exception()}")
+        messagebox.showerror("Pytesseract Error", f"Region OCR failed: {future.exception()}", parent=CONFIG["main_tk_root"]); return
+    job["results"].update(future.result()); job["done"] += 1; show_region_ocr_progress(job)
+    if job["done"] == job["total"]:
+        profiling.add("region_ocr_job", time.perf_counter() - job["start_time"], count=len(job["results"]))
+        end_region_ocr_job(f"OCRed {sum(1 for v in job['results'].values() if v is not None)} regions.")
+        if CONFIG["ocr_cache"]: print(CONFIG["ocr_cache"].summary())
+        job["on_done"](job["results"])
+
+def end_region_ocr_job(status_text):
+    job = CONFIG["region_ocr_job"]; CONFIG["region_ocr_job"] = None
+    if job: job["executor"].shutdown(wait=False, cancel_futures=True)
+    if region_ocr_progress_tk: region_ocr_progress_tk["value"] = 0
+    if region_ocr_cancel_button_tk: region_ocr_cancel_button_tk.config(state=tk.DISABLED)
+    set_ocr_status(status_text)
+
+def show_region_ocr_progress(job):
+    if region_ocr_progress_tk: region_ocr_progress_tk.config(maximum=job["total"], value=job["done"])
+    if region_ocr_cancel_button_tk: region_ocr_cancel_button_tk.config(state=tk.NORMAL)
+    set_ocr_status(f"OCR regions: {job['done']}/{job['total']} batches")
+
+def cmd_cancel_region_ocr():
+    # Chunks already inside Tesseract finish on their own; their results are discarded
+    if CONFIG["region_ocr_job"]: end_region_ocr_job("Region OCR cancelled.")
+
+def cmd_clear_tesseract_selections(): CONFIG["selected_tesseract_block_ids"].clear(); invalidate_overlay()
+def cmd_clear_custom_regions(): CONFIG["user_drawn_rects"].clear(); invalidate_overlay()
 def cmd_exit_application():
     if messagebox.askyesno("Exit", "Are you sure you want to exit?", parent=CONFIG["main_tk_root"]):
         if CONFIG["main_tk_root"]: CONFIG["main_tk_root"].quit(); CONFIG["main_tk_root"].destroy()
-        cv2.destroyAllWindows(); sys.exit(0)
-
-def initial_ocr_pass():
-    print("Performing initial OCR to identify Tesseract text blocks...")
-    try: ocr_data = pytesseract.image_to_data(CONFIG["gray_image"], config='--psm 1', output_type=Output.DICT)
-    except pytesseract.TesseractNotFoundError: print("ERROR: Tesseract not installed or not in PATH."); messagebox.showerror("Tesseract Error", "Tesseract is not installed or not found. Please install Tesseract OCR."); return False
-    except Exception as e: print(f"ERROR: Pytesseract failed: {e}"); messagebox.showerror("Pytesseract Error", f"Pytesseract image_to_data failed: {e}"); return False
-    CONFIG["tesseract_block_coords"].clear(); num_boxes = len(ocr_data['text'])
-    for i in range(num_boxes):
-        if int(ocr_data['conf'][i]) > CONFIG["ocr_confidence_threshold"]:
-            text = ocr_data['text'][i].strip();
-            if not text: continue
-            block_id = (ocr_data['block_num'][i], ocr_data['par_num'][i], ocr_data['line_num'][i]) # Line-level
-            x, y, w, h = ocr_data['left'][i], ocr_data['top'][i], ocr_data['width'][i], ocr_data['height'][i]
-            if block_id in CONFIG["tesseract_block_coords"]:
-                curr_x1, curr_y1, curr_x2, curr_y2 = CONFIG["tesseract_block_coords"][block_id]
-                CONFIG["tesseract_block_coords"][block_id] = (min(curr_x1, x), min(curr_y1, y), max(curr_x2, x + w), max(curr_y2, y + h))
-            else: CONFIG["tesseract_block_coords"][block_id] = (x, y, x + w, y + h)
-    if not CONFIG["tesseract_block_coords"]: print("No Tesseract text blocks detected."); messagebox.showinfo("OCR Info", "No Tesseract blocks were detected.", parent=CONFIG["main_tk_root"])
-    else: print(f"Detected {len(CONFIG['tesseract_block_coords'])} Tesseract text blocks (lines).")
+        cv2.destroyAllWindows()
+        if CONFIG["profile_path"]: profiling.report(CONFIG["profile_path"])
+        sys.exit(0)
+
+def set_ocr_status(text):
+    print(text)
+    if ocr_status_label_tk and ocr_status_label_tk.winfo_exists(): ocr_status_label_tk.config(text=text)
+
+def merge_band_blocks(band_index, band_count, band_blocks): #_ Tk thread: show one band's blocks as soon as it is done
+    for block_id, rect in band_blocks.items():
+        CONFIG["tesseract_block_coords"][block_id] = rect; CONFIG["block_index"].add(block_id, rect)
+    invalidate_overlay()
+    set_ocr_status(f"Detecting text blocks: {band_index + 1}/{band_count} bands, {len(CONFIG['tesseract_block_coords'])} lines")
+
+def finish_initial_ocr_pass(ocr_datas): #_
+    CONFIG["tesseract_words"] = ocr_engine.WordTable(ocr_engine.concat_ocr_data(ocr_datas), CONFIG["ocr_confidence_threshold"]) # Same words as the blocks
+    if not CONFIG["tesseract_block_coords"]: set_ocr_status("No Tesseract text blocks detected."); messagebox.showinfo("OCR Info", "No Tesseract blocks were detected.", parent=CONFIG["main_tk_root"])
+    else: set_ocr_status(f"Detected {len(CONFIG['tesseract_block_coords'])} Tesseract text blocks (lines).")
+    if CONFIG["ocr_cache"]: print(CONFIG["ocr_cache"].summary())
+
+def initial_ocr_pass(): #_ Runs on a worker thread; every UI update is handed to Tk via after()
+    root = CONFIG["main_tk_root"]; ocr_datas = []; start_time = time.perf_counter()
+    try:
+        for band_index, band_count, band_blocks, ocr_data in ocr_engine.iter_text_block_bands(
+                CONFIG["gray_image"], CONFIG["initial_ocr_band_height"], CONFIG["ocr_confidence_threshold"], CONFIG["ocr_cache"], CONFIG["image_digest"],
+                CONFIG["initial_ocr_band_overlap"], CONFIG["initial_ocr_band_workers"]):
+            ocr_datas.append(ocr_data)
+            root.after(0, lambda args=(band_index, band_count, band_blocks): merge_band_blocks(*args))
+    except pytesseract.TesseractNotFoundError:
+        print("ERROR: Tesseract not installed or not in PATH.")
+        root.after(0, lambda: messagebox.showerror("Tesseract Error", "Tesseract is not installed or not found. Please install Tesseract OCR.", parent=root)); return False
+    except Exception as e:
+        print(f"ERROR: Pytesseract failed: {e}")
+        root.after(0, lambda e=e: messagebox.showerror("Pytesseract Error", f"Pytesseract image_to_data failed: {e}", parent=root)); return False
+    profiling.add("initial_ocr_pass", time.perf_counter() - start_time, count=len(ocr_datas))
+    root.after(0, lambda: finish_initial_ocr_pass(ocr_datas))
     return True
 
+def start_initial_ocr_pass():
+    CONFIG["tesseract_block_coords"].clear(); CONFIG["tesseract_words"] = None; rebuild_block_index()
+    set_ocr_status("Performing initial OCR to identify Tesseract text blocks...")
+    threading.Thread(target=initial_ocr_pass, daemon=True).start()
+
 def main():
-    global mode_switch_button_tk, status_label_tk
-    if len(sys.argv) < 2:
+    global mode_switch_button_tk, status_label_tk, ocr_status_label_tk, region_ocr_progress_tk, region_ocr_cancel_button_tk
+    parser = argparse.ArgumentParser(usage="python tesseract_select_text_regions16.py [image] [--profile timings.json]")
+    parser.add_argument("image", nargs="?")
+    parser.add_argument("--profile", metavar="PATH", help="record stage timings (page pass, region OCR, corrections, reflow) and save them to PATH on exit")
+    args = parser.parse_args()
+    CONFIG["profile_path"] = args.profile; profiling.enable(bool(args.profile))
+    if not args.image:
         root_temp = tk.Tk(); root_temp.withdraw()
         CONFIG["image_path"] = filedialog.askopenfilename(title="Select Image File", filetypes=[("Image Files", "*.png *.jpg *.jpeg *.bmp *.tiff")])
         root_temp.destroy();
         if not CONFIG["image_path"]: print("No image file selected. Exiting."); return
-    else: CONFIG["image_path"] = sys.argv[1]
+    else: CONFIG["image_path"] = args.image
     if not os.path.exists(CONFIG["image_path"]): print(f"Error: Image file not found: '{CONFIG['image_path']}'"); return
     CONFIG["original_image"] = cv2.imread(CONFIG["image_path"])
     if CONFIG["original_image"] is None: print(f"Error: Could not read image: '{CONFIG['image_path']}'."); return
     CONFIG["gray_image"] = cv2.cvtColor(CONFIG["original_image"], cv2.COLOR_BGR2GRAY)
+    CONFIG["image_digest"] = image_digest(CONFIG["gray_image"])
+    try: CONFIG["ocr_cache"] = OCRCache(CONFIG["ocr_cache_dir"])
+    except OSError as e: print(f"Warning: OCR cache disabled ({e})")
 
-    CONFIG["main_tk_root"] = tk.Tk(); CONFIG["main_tk_root"].title("OCR Control Panel"); CONFIG["main_tk_root"].geometry("380x260") # Increased height for status
+    CONFIG["spell_service"] = SpellService(CONFIG["user_dict_file"]); CONFIG["spell_service"].preload() # Ready before the first editor opens
+    CONFIG["grammar_corrector"] = GrammarCorrector(OllamaClient(model=CONFIG["grammar_model"]), CONFIG["grammar_workers"])
+    CONFIG["main_tk_root"] = tk.Tk(); CONFIG["main_tk_root"].title("OCR Control Panel"); CONFIG["main_tk_root"].geometry("380x330") # Increased height for status and progress
     CONFIG["main_tk_root"].update_idletasks()
     screen_w, screen_h = CONFIG["main_tk_root"].winfo_screenwidth(), CONFIG["main_tk_root"].winfo_screenheight()
-    app_w, app_h = 380, 260
+    app_w, app_h = 380, 330
     CONFIG["main_tk_root"].geometry(f"{app_w}x{app_h}+{(screen_w // 2) - (app_w // 2)}+{(screen_h // 2) - (app_h // 2)}")
 
     load_global_corrections() # Load corrections at startup
-    if not initial_ocr_pass(): pass
-    
     show_corrections_editor(CONFIG["main_tk_root"]) # Show corrections editor at startup
 
+    setup_display(int(screen_w * 0.85), int(screen_h * 0.85))
     cv2.namedWindow(CONFIG["opencv_window_name"]); cv2.setMouseCallback(CONFIG["opencv_window_name"], mouse_callback)
     control_frame = tk.Frame(CONFIG["main_tk_root"], pady=5); control_frame.pack(expand=True, fill=tk.BOTH) # Reduced pady
     
     status_label_tk = tk.Label(control_frame, text="Mode: Select Tesseract Blocks")
     status_label_tk.pack(pady=(0,5))
+    ocr_status_label_tk = tk.Label(control_frame, text="", fg="gray30", wraplength=340)
+    ocr_status_label_tk.pack()
 
     mode_switch_button_tk = tk.Button(control_frame, text="Switch to Draw Custom Rectangles", command=cmd_switch_interaction_mode)
     mode_switch_button_tk.pack(pady=5, padx=20, fill=tk.X)
     tk.Button(control_frame, text="Process Selected & Drawn Regions", command=cmd_process_selected_regions, height=2).pack(pady=5, padx=20, fill=tk.X)
+    progress_frame = tk.Frame(control_frame); progress_frame.pack(fill=tk.X, padx=20)
+    region_ocr_progress_tk = ttk.Progressbar(progress_frame, mode="determinate"); region_ocr_progress_tk.pack(side=tk.LEFT, expand=True, fill=tk.X)
+    region_ocr_cancel_button_tk = tk.Button(progress_frame, text="Cancel", command=cmd_cancel_region_ocr, state=tk.DISABLED)
+    region_ocr_cancel_button_tk.pack(side=tk.LEFT, padx=(5,0))
     clear_frame = tk.Frame(control_frame); clear_frame.pack(fill=tk.X, padx=15)
     tk.Button(clear_frame, text="Clear Tesseract Selections", command=cmd_clear_tesseract_selections).pack(side=tk.LEFT, pady=5, padx=5, expand=True, fill=tk.X)
     tk.Button(clear_frame, text="Clear Custom Rectangles", command=cmd_clear_custom_regions).pack(side=tk.LEFT, pady=5, padx=5, expand=True, fill=tk.X)
     tk.Button(control_frame, text="Exit Application", command=cmd_exit_application).pack(pady=(10,5), padx=20, fill=tk.X)
     CONFIG["main_tk_root"].protocol("WM_DELETE_WINDOW", cmd_exit_application)
     update_opencv_window()
+    start_initial_ocr_pass() # Blocks stream into the overlay band by band while the UI is already usable
     CONFIG["main_tk_root"].mainloop()
 
 if __name__ == "__main__":
@@ -0,0 +1,122 @@
+import json
+import os
+import numpy as np
+from ocr_engine import WordTable
+
+# Per-book word-box sidecar: Tesseract's word boxes for every page, stored as
+# raw column files in a "<book>.words" directory and described by meta.json,
+# so readers can np.memmap them without parsing anything.
+
+SIDECAR_FORMAT = 1
+COLUMNS = {
+    "page": ("<u4", 1),          # page index of each word
+    "box": ("<i4", 4),           # left, top, width, height in rendered pixels
+    "conf": ("<f4", 1),
+    "line": ("<i4", 3),          # Tesseract block, paragraph and line number
+    "text_end": ("<u8", 1),      # end offset of each word in text.bin
+    "page_end": ("<u8", 2),      # per page: words and text bytes written up to its end
+    "page_size": ("<i4", 2),     # per page: rendered width and height in pixels
+}
+TEXT_FILE = "text.bin"
+
+def sidecar_path(output_text_path):
+    return os.path.splitext(output_text_path)[0] + ".words"
+
+def _column_path(path, name):
+    return os.path.join(path, name + ".bin")
+
+def _read_column(path, name):
+    dtype, width = COLUMNS[name]
+    file_path = _column_path(path, name)
+    count = os.path.getsize(file_path) // (np.dtype(dtype).itemsize * width) if os.path.exists(file_path) else 0
+    if count == 0: return np.empty((0, width) if width > 1 else 0, dtype=dtype)
+    shape = (count, width) if width > 1 else (count,)
+    return np.memmap(file_path, dtype=dtype, mode="r", shape=shape)
+
+def pages_on_disk(path):
+    """Number of complete pages in a sidecar (0 if there is none)."""
+    return len(_read_column(path, "page_end")) if os.path.isdir(path) else 0
+
+class WordBoxWriter:
+    """Appends one page at a time to a sidecar; only the current page is in memory.
+
+    With `keep_pages`, an existing sidecar is truncated to its first
+    `keep_pages` pages and extended from there (for ocr_pdf --resume).
+    """
+
+    def __init__(self, path, dpi, keep_pages=0):
+        self.path = path; self.dpi = dpi
+        os.makedirs(path, exist_ok=True)
+        page_end = _read_column(path, "page_end")
+        self.pages = min(keep_pages, len(page_end))
+        self.words, self.text_bytes = (int(page_end[self.pages - 1][0]), int(page_end[self.pages - 1][1])) if self.pages else (0, 0)
+        del page_end
+        sizes = {name: self.words for name in ("page", "box", "conf", "line", "text_end")}
+        sizes.update(page_end=self.pages, page_size=self.pages)
+        self._files = {}
+        for name, (dtype, width) in COLUMNS.items():
+            f = open(_column_path(path, name), "r+b" if self.pages else "wb")
+            f.truncate(sizes[name] * np.dtype(dtype).itemsize * width); f.seek(0, os.SEEK_END)
+            self._files[name] = f
+        self._text = open(os.path.join(path, TEXT_FILE), "r+b" if self.pages else "wb")
+        self._text.truncate(self.text_bytes); self._text.seek(0, os.SEEK_END)
+        self._write_meta(complete=False)
+
+    def add_page(self, page_index, ocr_data, image_size):
+        if page_index != self.pages: raise ValueError(f"Expected page {self.pages}, got {page_index}")
+        words = WordTable(ocr_data)
+        line = np.zeros((len(words), 3), dtype=COLUMNS["line"][0])
+        for block_id, (start, end) in words.line_slices.items(): line[start:end] = block_id
+        encoded = [word.encode("utf-8") for word in words.text]
+        text_end = self.text_bytes + np.cumsum([len(word) for word in encoded], dtype=np.uint64)
+        columns = {"page": np.full(len(words), page_index), "box": words.boxes, "conf": words.conf, "line": line, "text_end": text_end}
+        for name, values in columns.items():
+            self._files[name].write(np.ascontiguousarray(values, dtype=COLUMNS[name][0]).tobytes())
+        self._text.write(b"".join(encoded))
+        self.words += len(words); self.text_bytes += sum(len(word) for word in encoded)
+        # The page table goes last, so a crash never leaves a page recorded whose words are missing
+        for f in list(self._files.values()) + [self._text]: f.flush()
+        self._files["page_size"].write(np.array(image_size, dtype=COLUMNS["page_size"][0]).tobytes())
+        self._files["page_end"].write(np.array([self.words, self.text_bytes], dtype=COLUMNS["page_end"][0]).tobytes())
+        self._files["page_size"].flush(); self._files["page_end"].flush()
+        self.pages += 1
+
+    def _write_meta(self, complete):
+        meta = {"format": SIDECAR_FORMAT, "dpi": self.dpi, "pages": self.pages, "words": self.words, "complete": complete,
+                "text_file": TEXT_FILE, "columns": {name: {"dtype": dtype, "width": width, "file": name + ".bin"}
+                                                    for name, (dtype, width) in COLUMNS.items()}}
+        with open(os.path.join(self.path, "meta.json"), "w", encoding="utf-8") as f: json.dump(meta, f, indent=1)
+
+    def close(self):
+        for f in list(self._files.values()) + [self._text]: f.close()
+        self._write_meta(complete=True)
+
+class WordBoxes:
+    """Read-only, memory-mapped view of a sidecar."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f: self.meta = json.load(f)
+        if self.meta.get("format") != SIDECAR_FORMAT: raise ValueError(f"Unsupported word-box sidecar format in '{path}'")
+        self.dpi = self.meta["dpi"]
+        self.page_end = _read_column(path, "page_end"); self.page_size = _read_column(path, "page_size")
+        self.page = _read_column(path, "page"); self.box = _read_column(path, "box"); self.conf = _read_column(path, "conf")
+        self.line = _read_column(path, "line"); self.text_end = _read_column(path, "text_end")
+        text_path = os.path.join(path, TEXT_FILE)
+        self.text_bytes = np.memmap(text_path, dtype=np.uint8, mode="r") if os.path.getsize(text_path) else np.empty(0, np.uint8)
+
+    def __len__(self):
+        return len(self.page_end)
+
+    def word_range(self, page_index):
+        start = int(self.page_end[page_index - 1][0]) if page_index else 0
+        return start, int(self.page_end[page_index][0])
+
+    def word_text(self, i):
+        start = int(self.text_end[i - 1]) if i else 0
+        return bytes(self.text_bytes[start:int(self.text_end[i])]).decode("utf-8")
+
+    def page_words(self, page_index):
+        """Returns (boxes, conf, line, texts) for one page; the arrays are memmap slices."""
+        start, end = self.word_range(page_index)
+        return self.box[start:end], self.conf[start:end], self.line[start:end], [self.word_text(i) for i in range(start, end)]